@@ -3,6 +3,9 @@ Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
 filename: NLPParserError.py
 description: Custom exception class to deal with wrong file type extensions
 """
+import functools
+
+
 class NLPParserError:
     class InvalidTextFileFormat(Exception):
         pass
@@ -13,6 +16,7 @@ class NLPParserError:
             Args: function f to decorate
             Returns: wrapper fn applied to given fn f
         """
+        @functools.wraps(f)
         def wrapper(*args, **kwargs):
             """ Wrapper fn to check file type extension and to raise exception if
                 file with invalid extension is given
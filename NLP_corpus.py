@@ -0,0 +1,607 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_corpus.py
+description: Compact corpus representation. Words are interned once in a shared vocabulary,
+             word counts live in a CSR document-term matrix, token streams and per-document
+             statistics live in NumPy arrays, and dictionary-like views keep exposing
+             data['wordcount'], data['numwords'], ... as before. Corpora are saved as
+             .npy arrays that load memory-mapped.
+"""
+
+from collections import Counter, defaultdict
+from collections.abc import MutableMapping
+import json
+import os
+import numpy as np
+
+# Per-document fields stored in the corpus arrays, anything else is kept in plain dictionaries
+FIELDS = ('wordcount', 'numwords', 'polarity', 'subjectivity', 'allwords')
+
+# Bit of each field in the per-document flags telling which fields a document has
+_FLAGS = {field: 1 << i for i, field in enumerate(FIELDS)}
+
+# Numeric fields stored in per-document arrays
+_STATISTICS = ('numwords', 'polarity', 'subjectivity')
+
+_EMPTY_IDS = np.empty(0, dtype=np.int32)
+
+# Version of the on-disk corpus layout written by Corpus.save
+FORMAT_VERSION = 1
+
+# Corpus arrays saved as <name>.npy
+_ARRAYS = ('indptr', 'indices', 'counts', 'tokptr', 'tokens',
+           'numwords', 'polarity', 'subjectivity', 'flags')
+
+
+class ReadOnlyCounter(Counter):
+    """
+    Counter built from the corpus on each access to data['wordcount'][label]. Changing it in
+    place wouldn't change the corpus, so it raises TypeError instead: assign a new Counter
+    (data['wordcount'][label] = counter) or work on a copy (counter.copy())
+    """
+    def __init__(self, counts=()):
+        dict.update(self, counts)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Word counts read from a corpus are read-only, assign "
+                        "data['wordcount'][label] = counter to change them or use .copy()")
+
+    __setitem__ = __delitem__ = update = subtract = clear = pop = popitem = setdefault = _read_only
+    __iadd__ = __isub__ = __ior__ = __iand__ = _read_only
+
+    def copy(self):
+        """ Mutable copy, as a plain Counter """
+        return Counter(self)
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class Vocabulary:
+    def __init__(self, words=()):
+        # id --> word and word --> id
+        self.words = list()
+        self._index = dict()
+        self.intern_many(list(words))
+
+    @classmethod
+    def from_unique(cls, words):
+        """
+        Vocabulary of distinct words, in id order. The word --> id index is only built
+        once needed, so a reloaded vocabulary used for lookups alone costs one list
+        """
+        vocab = cls()
+        vocab.words = list(words)
+        vocab._index = None
+        return vocab
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = dict(zip(self.words, range(len(self.words))))
+        return self._index
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def intern(self, word):
+        """
+        Get the id of a word, adding it to the vocabulary if it's new
+        """
+        word_id = self.index.get(word)
+        if word_id is None:
+            word_id = self.index[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def intern_many(self, words):
+        """
+        Get the ids of a sequence of words, adding new words to the vocabulary
+        Args:
+            words: list of words
+        Returns:
+            int32 array of word ids
+        """
+        ids = list(map(self.index.get, words))
+        if None in ids:
+            for i, word_id in enumerate(ids):
+                if word_id is None:
+                    ids[i] = self.intern(words[i])
+        return np.array(ids, dtype=np.int32)
+
+    def lookup(self, ids):
+        """
+        Get the words of a sequence of ids
+        """
+        return list(map(self.words.__getitem__, np.asarray(ids).tolist()))
+
+
+class _GrowableArray:
+    """ NumPy array with amortized O(1) appends. view() returns the filled part. """
+    def __init__(self, dtype, capacity=64):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, size):
+        if size > len(self._data):
+            data = np.empty(max(size, 2 * len(self._data)), dtype=self._data.dtype)
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+
+    def append(self, value):
+        self._reserve(self.size + 1)
+        self._data[self.size] = value
+        self.size += 1
+
+    def extend(self, values):
+        values = np.asarray(values)
+        end = self.size + len(values)
+        self._reserve(end)
+        self._data[self.size:end] = values
+        self.size = end
+
+    def view(self):
+        return self._data[:self.size]
+
+    def wrap(self, array):
+        """ Use an existing array (e.g. memory-mapped) as the whole content, without copying """
+        self._data = array
+        self.size = len(array)
+
+    def replace(self, values):
+        """ Replace the whole content """
+        self._data = np.array(values, dtype=self._data.dtype)
+        self.size = len(self._data)
+
+
+class Corpus:
+    def __init__(self, vocab=None, keep_tokens=True):
+        """
+        Args:
+            vocab: Vocabulary to share with other corpora (a new one by default)
+            keep_tokens: store each document's token stream so 'allwords' can be rebuilt.
+                         Without it only word counts and statistics are kept
+        """
+        self.vocab = vocab if vocab is not None else Vocabulary()
+        self.keep_tokens = keep_tokens
+
+        # label --> row, in the order labels were first added; row --> label (None once removed)
+        self.rows = dict()
+        self.row_labels = list()
+        # Incremented whenever rows are renumbered (see compact)
+        self.generation = 0
+
+        # CSR document-term matrix: row r has word ids indices[indptr[r]:indptr[r+1]]
+        # with matching counts, in the order words first appeared in the document
+        self.indptr = _GrowableArray(np.int64)
+        self.indptr.append(0)
+        self.indices = _GrowableArray(np.int32)
+        self.counts = _GrowableArray(np.int32)
+
+        # Token streams as word ids, laid out like the matrix rows
+        self.tokptr = _GrowableArray(np.int64)
+        self.tokptr.append(0)
+        self.tokens = _GrowableArray(np.int32)
+
+        # Per-document statistics
+        self.numwords = _GrowableArray(np.int64)
+        self.polarity = _GrowableArray(np.float64)
+        self.subjectivity = _GrowableArray(np.float64)
+        self.flags = _GrowableArray(np.uint8)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, label):
+        return label in self.rows
+
+    def add(self, label, results):
+        """
+        Add or replace a document from parser results
+        Args:
+            label: document label
+            results: dictionary with any of the FIELDS keys
+        """
+        wordcount = results.get('wordcount')
+        ids = counts = None
+        if wordcount is not None:
+            ids = self.vocab.intern_many(list(wordcount.keys()))
+            counts = np.fromiter(wordcount.values(), dtype=np.int32, count=len(wordcount))
+        self.add_counts(label, ids, counts, numwords=results.get('numwords'),
+                        polarity=results.get('polarity'), subjectivity=results.get('subjectivity'),
+                        allwords=results.get('allwords'))
+
+    def add_counts(self, label, ids, counts, numwords=None, polarity=None, subjectivity=None,
+                   allwords=None, tokens=None):
+        """
+        Add or replace a document from word ids of this corpus' vocabulary
+        Args:
+            label: document label
+            ids, counts: arrays of word ids and their counts, or None if the document has no word counts
+            numwords, polarity, subjectivity: statistics, None when unknown
+            allwords: space-joined words of the document, or tokens: its word ids
+        """
+        flags = 0
+        if ids is not None:
+            flags |= _FLAGS['wordcount']
+            self.indices.extend(ids)
+            self.counts.extend(counts)
+        self.indptr.append(len(self.indices))
+
+        if allwords is not None and tokens is None and self.keep_tokens:
+            tokens = self.vocab.intern_many(allwords.split(' ')) if allwords else _EMPTY_IDS
+        if tokens is not None and self.keep_tokens:
+            flags |= _FLAGS['allwords']
+            self.tokens.extend(tokens)
+        self.tokptr.append(len(self.tokens))
+
+        for field, value, store, missing in (('numwords', numwords, self.numwords, -1),
+                                             ('polarity', polarity, self.polarity, np.nan),
+                                             ('subjectivity', subjectivity, self.subjectivity, np.nan)):
+            if value is not None:
+                flags |= _FLAGS[field]
+            store.append(missing if value is None else value)
+        self.flags.append(flags)
+
+        if label in self.rows:
+            self.row_labels[self.rows[label]] = None
+        self.rows[label] = len(self.row_labels)
+        self.row_labels.append(label)
+        self._maybe_compact()
+
+    def remove(self, label):
+        """
+        Remove a document
+        """
+        row = self.rows.pop(label)
+        self.row_labels[row] = None
+        self._maybe_compact()
+
+    def has(self, label, field):
+        """
+        Whether a document has a value for a field
+        """
+        row = self.rows.get(label)
+        return row is not None and bool(self.flags.view()[row] & _FLAGS[field])
+
+    def labels(self, field=None):
+        """
+        Labels of all documents, or only of those having a value for a field
+        """
+        if field is None:
+            return list(self.rows)
+        bit = _FLAGS[field]
+        flags = self.flags.view()
+        return [label for label, row in self.rows.items() if flags[row] & bit]
+
+    def row_counts(self, label):
+        """
+        Word ids and counts of a document, as array views
+        """
+        row = self.rows[label]
+        start, end = self.indptr.view()[row:row + 2]
+        return self.indices.view()[start:end], self.counts.view()[start:end]
+
+    def row_tokens(self, label):
+        """
+        Token stream of a document as an array view of word ids
+        """
+        row = self.rows[label]
+        start, end = self.tokptr.view()[row:row + 2]
+        return self.tokens.view()[start:end]
+
+    def get(self, label, field):
+        """
+        Value of one field of a document, in the same form parsers return it
+        Raises:
+            KeyError if the document doesn't exist or has no value for the field
+        """
+        if not self.has(label, field):
+            raise KeyError(label)
+        row = self.rows[label]
+        if field == 'wordcount':
+            ids, counts = self.row_counts(label)
+            return ReadOnlyCounter(zip(self.vocab.lookup(ids), counts.tolist()))
+        if field == 'allwords':
+            return ' '.join(self.vocab.lookup(self.row_tokens(label)))
+        if field == 'numwords':
+            return int(self.numwords.view()[row])
+        return float(getattr(self, field).view()[row])
+
+    def set(self, label, field, value):
+        """
+        Set one field of a document, creating the document if needed
+        """
+        row = self.rows.get(label)
+        if row is not None and field in _STATISTICS:
+            getattr(self, field).view()[row] = value
+            self.flags.view()[row] |= _FLAGS[field]
+            return
+        results = self.results(label) if row is not None else dict()
+        results[field] = value
+        self.add(label, results)
+
+    def unset(self, label, field):
+        """
+        Remove one field of a document, removing the document once it has no fields left
+        """
+        if not self.has(label, field):
+            raise KeyError(label)
+        results = self.results(label)
+        del results[field]
+        if results:
+            self.add(label, results)
+        else:
+            self.remove(label)
+
+    def results(self, label):
+        """
+        All fields of a document as a parser results dictionary
+        """
+        return {field: self.get(label, field) for field in FIELDS if self.has(label, field)}
+
+    def gather_rows(self, labels):
+        """
+        Flatten the word counts of several documents
+        Returns:
+            tuple of (document position in labels, word id, count) arrays
+        """
+        rows = np.fromiter((self.rows[label] for label in labels), dtype=np.int64, count=len(labels))
+        bounds = self.indptr.view()
+        starts, lengths = bounds[rows], bounds[rows + 1] - bounds[rows]
+        lengths[(self.flags.view()[rows] & _FLAGS['wordcount']) == 0] = 0
+        offsets = np.cumsum(lengths) - lengths
+        take = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+        positions = np.repeat(np.arange(len(rows)), lengths)
+        return positions, self.indices.view()[take], self.counts.view()[take]
+
+    def get_column(self, labels, field):
+        """
+        A numeric field (numwords, polarity or subjectivity) of several existing documents at once
+        Returns:
+            array of the values, NaN (or -1 for numwords) where a document has none
+        """
+        rows = np.fromiter((self.rows[label] for label in labels), dtype=np.int64, count=len(labels))
+        return getattr(self, field).view()[rows]
+
+    def set_column(self, labels, field, values):
+        """
+        Set a numeric field (numwords, polarity or subjectivity) of several existing documents at once
+        """
+        rows = np.fromiter((self.rows[label] for label in labels), dtype=np.int64, count=len(labels))
+        getattr(self, field).view()[rows] = values
+        self.flags.view()[rows] |= _FLAGS[field]
+
+    def merge_rows(self, labels):
+        """
+        Sum the word counts of several documents
+        Returns:
+            tuple of (word ids, counts) arrays
+        """
+        parts = [self.row_counts(label) for label in labels if self.has(label, 'wordcount')]
+        if not parts:
+            return _EMPTY_IDS, _EMPTY_IDS
+        ids = np.concatenate([p[0] for p in parts])
+        counts = np.concatenate([p[1] for p in parts])
+        unique, inverse = np.unique(ids, return_inverse=True)
+        return unique.astype(np.int32), np.bincount(inverse, weights=counts).astype(np.int32)
+
+    def total_counts(self, labels=None):
+        """
+        Corpus-wide count of every vocabulary word, over all or some documents
+        Returns:
+            int64 array indexed by word id
+        """
+        if labels is None:
+            self.compact()
+            ids, counts = self.indices.view(), self.counts.view()
+        else:
+            ids, counts = self.merge_rows(labels)
+        return np.bincount(ids, weights=counts, minlength=len(self.vocab)).astype(np.int64)
+
+    def top_words(self, k, labels=None):
+        """
+        The k most common words over all or some documents
+        Returns:
+            list of (word, count) tuples, most common first
+        """
+        totals = self.total_counts(labels)
+        k = min(k, np.count_nonzero(totals))
+        if k <= 0:
+            return []
+        top = np.argpartition(-totals, k - 1)[:k]
+        top = top[np.argsort(-totals[top], kind='stable')]
+        return list(zip(self.vocab.lookup(top), totals[top].tolist()))
+
+    def _maybe_compact(self):
+        """ Drop removed and replaced rows once they outnumber the live ones """
+        if len(self.row_labels) - len(self.rows) > max(len(self.rows), 64):
+            self.compact()
+
+    def compact(self):
+        """
+        Rebuild the arrays without removed or replaced documents, in label order
+        """
+        if len(self.row_labels) == len(self.rows) and list(self.rows.values()) == list(range(len(self.rows))):
+            return
+        rows = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+
+        for ptr, *arrays in ((self.indptr, self.indices, self.counts), (self.tokptr, self.tokens)):
+            bounds = ptr.view()
+            starts, lengths = bounds[rows], bounds[rows + 1] - bounds[rows]
+            new_ptr = np.concatenate(([0], np.cumsum(lengths)))
+            take = np.arange(new_ptr[-1]) - np.repeat(new_ptr[:-1] - starts, lengths)
+            for array in arrays:
+                array.replace(array.view()[take])
+            ptr.replace(new_ptr)
+
+        for array in (self.numwords, self.polarity, self.subjectivity, self.flags):
+            array.replace(array.view()[rows])
+
+        self.row_labels = list(self.rows)
+        self.rows = {label: row for row, label in enumerate(self.row_labels)}
+        self.generation += 1
+
+
+    def save(self, directory):
+        """
+        Write the corpus to a directory: one .npy file per array, the vocabulary as
+        NUL-separated UTF-8 words and the labels in corpus.json (see load). Each file is
+        written under a temporary name and then replaced, so a corpus memory-mapped from
+        the same directory can be saved back to it
+        """
+        self.compact()
+        os.makedirs(directory, exist_ok=True)
+        blob = '\0'.join(self.vocab.words)
+        if blob.count('\0') != max(len(self.vocab) - 1, 0):
+            raise ValueError("Can't save a vocabulary with words containing NUL characters")
+
+        def replace(name, write):
+            path = os.path.join(directory, name)
+            with open(f'{path}.tmp', 'wb') as f:
+                write(f)
+            os.replace(f'{path}.tmp', path)
+
+        for name in _ARRAYS:
+            replace(f'{name}.npy', lambda f: np.save(f, getattr(self, name).view()))
+        replace('vocab.bin', lambda f: f.write(blob.encode('utf-8')))
+
+        meta = {'version': FORMAT_VERSION, 'keep_tokens': self.keep_tokens,
+                'words': len(self.vocab), 'labels': self.row_labels}
+        replace('corpus.json', lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+    @classmethod
+    def load(cls, directory, mmap=True, vocab=None):
+        """
+        Open a corpus written by save
+        Args:
+            directory: corpus directory
+            mmap: memory-map the arrays instead of reading them. Pages are copy-on-write,
+                  so the corpus can still be modified without touching the files
+            vocab: Vocabulary to share with other corpora, e.g. the reopened corpus a group
+                   corpus was saved along with. It must start with the saved vocabulary
+        Returns:
+            Corpus
+        """
+        with open(os.path.join(directory, 'corpus.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format version {meta.get('version')!r} in {directory}")
+
+        with open(os.path.join(directory, 'vocab.bin'), 'rb') as f:
+            words = f.read().decode('utf-8').split('\0') if meta['words'] else []
+        if vocab is None:
+            vocab = Vocabulary.from_unique(words)
+        elif vocab.words[:len(words)] != words:
+            raise ValueError(f"The vocabulary given doesn't match the one saved in {directory}")
+        corpus = cls(vocab=vocab, keep_tokens=meta['keep_tokens'])
+        for name in _ARRAYS:
+            array = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='c' if mmap else None)
+            getattr(corpus, name).wrap(array)
+
+        # JSON turns tuple labels into lists
+        corpus.row_labels = [tuple(label) if isinstance(label, list) else label for label in meta['labels']]
+        corpus.rows = {label: row for row, label in enumerate(corpus.row_labels)}
+        return corpus
+
+
+class CorpusColumn(MutableMapping):
+    """ Dictionary-like view of one field of a corpus: label --> value """
+    def __init__(self, corpus, field):
+        self.corpus = corpus
+        self.field = field
+
+    def __getitem__(self, label):
+        return self.corpus.get(label, self.field)
+
+    def __setitem__(self, label, value):
+        self.corpus.set(label, self.field, value)
+
+    def __delitem__(self, label):
+        self.corpus.unset(label, self.field)
+
+    def __contains__(self, label):
+        return self.corpus.has(label, self.field)
+
+    def __iter__(self):
+        return iter(self.corpus.labels(self.field))
+
+    def __len__(self):
+        return len(self.corpus.labels(self.field))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class CorpusData(MutableMapping):
+    """
+    Drop-in replacement for the analyzers' defaultdict(dict) data: statistic name -->
+    {label --> value}. FIELDS are views over a Corpus, other statistics are plain dictionaries.
+    Values of FIELDS are built from the corpus on each access, so they are copies: assigning
+    data[field][label] = value stores a new value, while data['wordcount'][label] is a
+    ReadOnlyCounter that raises TypeError on in-place changes (e.g. [word] += 1 or .update())
+    rather than silently losing them.
+    """
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.columns = {field: CorpusColumn(corpus, field) for field in FIELDS}
+        self.extras = defaultdict(dict)
+
+    def save(self, label, results):
+        """
+        Store the results of parsing one document. As with the dictionaries this replaces,
+        only the given statistics of an existing document change, the others are kept
+        """
+        core = {k: v for k, v in results.items() if k in self.columns}
+        if core and label in self.corpus and not set(FIELDS) <= core.keys():
+            if all(k in _STATISTICS and v is not None for k, v in core.items()):
+                for k, v in core.items():
+                    self.corpus.set(label, k, v)
+                core = None
+            else:
+                core = {**self.corpus.results(label), **core}
+        if core:
+            self.corpus.add(label, core)
+        for k, v in results.items():
+            if k not in self.columns:
+                self.extras[k][label] = v
+
+    def __getitem__(self, key):
+        if key in self.columns:
+            return self.columns[key]
+        return self.extras[key]
+
+    def __setitem__(self, key, value):
+        if key in self.columns:
+            column = self.columns[key]
+            for label in list(column):
+                del column[label]
+            column.update(value)
+        else:
+            self.extras[key] = value
+
+    def __delitem__(self, key):
+        if key in self.columns:
+            self[key] = {}
+        else:
+            del self.extras[key]
+
+    def __contains__(self, key):
+        if key in self.columns:
+            return len(self.columns[key]) > 0
+        return key in self.extras
+
+    def __iter__(self):
+        for field, column in self.columns.items():
+            if len(column):
+                yield field
+        yield from self.extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,169 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_index.py
+description: Inverted index over a Corpus: word --> postings of (document, count). Documents
+             added to the corpus are indexed in segments (column-major copies of the new
+             rows of the document-term matrix) that are merged as they pile up, so a term
+             lookup costs time proportional to its postings rather than to the corpus.
+"""
+
+import numpy as np
+
+
+class _Segment:
+    """ Postings of a range of corpus rows, grouped by word id """
+    __slots__ = ('words', 'wordptr', 'rows', 'counts')
+
+    def __init__(self, words, wordptr, rows, counts):
+        # words[i] (sorted word ids occurring in the segment) has documents
+        # rows[wordptr[i]:wordptr[i+1]] (in row order) with matching counts
+        self.words = words
+        self.wordptr = wordptr
+        self.rows = rows
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, word_ids, rows, counts):
+        """ Segment from postings in row order, in time proportional to the number of postings """
+        order = np.argsort(word_ids, kind='stable')
+        sorted_ids = word_ids[order]
+        starts = np.flatnonzero(np.diff(sorted_ids)) + 1
+        if len(sorted_ids):
+            starts = np.concatenate(([0], starts))
+        wordptr = np.append(starts, len(sorted_ids)).astype(np.int64)
+        return cls(sorted_ids[starts], wordptr, rows[order], counts[order])
+
+    def word_ids(self):
+        """ Word id of every posting """
+        return np.repeat(self.words, np.diff(self.wordptr))
+
+    def postings(self, word_id):
+        i = np.searchsorted(self.words, word_id)
+        if i == len(self.words) or self.words[i] != word_id:
+            return self.rows[:0], self.counts[:0]
+        start, end = self.wordptr[i:i + 2]
+        return self.rows[start:end], self.counts[start:end]
+
+
+class InvertedIndex:
+    def __init__(self, corpus):
+        """
+        Args:
+            corpus: NLP_corpus.Corpus to index. Documents added to it later are indexed on
+                    the next query, replaced and removed ones are skipped
+        """
+        self.corpus = corpus
+        # Segments of postings, oldest (and largest) first, covering corpus rows [0, indexed)
+        self.segments = []
+        self.indexed = 0
+        self._generation = corpus.generation
+
+    def __len__(self):
+        """ Number of postings indexed, including those of replaced or removed documents """
+        self.update()
+        return sum(len(segment) for segment in self.segments)
+
+    def update(self):
+        """
+        Index the rows added to the corpus since the last update. Compacting the corpus
+        renumbers its rows, in which case everything is indexed again
+        """
+        corpus = self.corpus
+        if corpus.generation != self._generation:
+            self.segments = []
+            self.indexed = 0
+            self._generation = corpus.generation
+        end = len(corpus.row_labels)
+        if end == self.indexed:
+            return
+
+        bounds = corpus.indptr.view()
+        start, stop = bounds[self.indexed], bounds[end]
+        rows = np.repeat(np.arange(self.indexed, end, dtype=np.int64), np.diff(bounds[self.indexed:end + 1]))
+        segment = _Segment.build(corpus.indices.view()[start:stop], rows, corpus.counts.view()[start:stop])
+        self.segments.append(segment)
+        self.indexed = end
+
+        # Merge segments of similar size so that there are only O(log postings) of them and
+        # each posting is copied O(log postings) times
+        while len(self.segments) > 1 and len(self.segments[-2]) <= 2 * len(self.segments[-1]):
+            newer = self.segments.pop()
+            older = self.segments.pop()
+            self.segments.append(_Segment.build(
+                np.concatenate((older.word_ids(), newer.word_ids())),
+                np.concatenate((older.rows, newer.rows)),
+                np.concatenate((older.counts, newer.counts))))
+
+    def _postings(self, word):
+        """
+        Returns:
+            tuple of (corpus rows, counts) arrays of the live documents containing word
+        """
+        self.update()
+        word_id = self.corpus.vocab.index.get(word)
+        if word_id is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        parts = [segment.postings(word_id) for segment in self.segments]
+        rows = np.concatenate([part[0] for part in parts]) if parts else np.empty(0, dtype=np.int64)
+        counts = np.concatenate([part[1] for part in parts]) if parts else np.empty(0, dtype=np.int32)
+        row_labels = self.corpus.row_labels
+        live = np.fromiter((row_labels[row] is not None for row in rows.tolist()), dtype=bool, count=len(rows))
+        return rows[live], counts[live]
+
+    def postings(self, word):
+        """
+        Documents containing a word
+        Returns:
+            list of (label, count) tuples, in load order
+        """
+        rows, counts = self._postings(word)
+        row_labels = self.corpus.row_labels
+        return [(row_labels[row], count) for row, count in zip(rows.tolist(), counts.tolist())]
+
+    def document_frequency(self, word):
+        """
+        Number of documents containing a word
+        """
+        return len(self._postings(word)[0])
+
+    def total_count(self, word):
+        """
+        Number of occurrences of a word over all documents
+        """
+        return int(self._postings(word)[1].sum())
+
+    def top_documents(self, word, k):
+        """
+        The k documents using a word the most
+        Returns:
+            list of (label, count) tuples, most occurrences first (load order among ties)
+        """
+        rows, counts = self._postings(word)
+        k = min(k, len(rows))
+        if k <= 0:
+            return []
+        # Every document above the k-th largest count, then the first ones tied with it
+        threshold = -np.partition(-counts, k - 1)[k - 1]
+        above = np.flatnonzero(counts > threshold)
+        tied = np.flatnonzero(counts == threshold)[:k - len(above)]
+        top = np.concatenate((above, tied))
+        top = top[np.lexsort((rows[top], -counts[top]))]
+        row_labels = self.corpus.row_labels
+        return [(row_labels[row], count) for row, count in zip(rows[top].tolist(), counts[top].tolist())]
+
+    def document_counts(self, words):
+        """
+        Counts of some words in every document containing any of them
+        Returns:
+            tuple of (labels in load order, list of matching word --> count dictionaries)
+        """
+        documents = dict()
+        for word in words:
+            rows, counts = self._postings(word)
+            for row, count in zip(rows.tolist(), counts.tolist()):
+                documents.setdefault(row, dict())[word] = count
+        rows = sorted(documents)
+        return [self.corpus.row_labels[row] for row in rows], [documents[row] for row in rows]
@@ -0,0 +1,239 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_instrument.py
+description: Opt-in instrumentation of NLPTextAnalyzer and sankey_lib: per-stage wall time,
+             per-file byte/token/stopword counts and peak memory, forwarded to user hooks and
+             dumped as JSON or a summary table. Disabled by default, in which case a stage
+             costs one attribute check.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class _NullStage:
+    """ Context manager doing nothing, shared by every stage while instrumentation is off """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """ Context manager timing one run of a stage """
+    __slots__ = ('instrument', 'name', 'start')
+
+    def __init__(self, instrument, name):
+        self.instrument = instrument
+        self.name = name
+
+    def __enter__(self):
+        if self.instrument.trace_memory:
+            self.instrument._push_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak = self.instrument._pop_peak() if self.instrument.trace_memory else None
+        self.instrument.record_stage(self.name, seconds, peak_mb=peak)
+        return False
+
+
+def peak_rss_mb():
+    """
+    High-water mark of the process' resident memory in MB, or None where unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+class Instrumentation:
+    def __init__(self, enabled=False, trace_memory=False):
+        """
+        Args:
+            enabled: record metrics
+            trace_memory: also trace Python allocations with tracemalloc (slower, but gives
+                          the peak memory of each stage rather than only of the whole process)
+        """
+        self.enabled = False
+        self.trace_memory = False
+        # stage name --> {'calls', 'seconds', 'peak_mb'}
+        self.stages = dict()
+        # file path --> {'bytes', 'tokens', 'stopwords', ...}
+        self.files = dict()
+        # Functions called as hook(kind, name, metrics) with kind 'stage' or 'file'
+        self.hooks = []
+        # Peak traced memory of each open stage, innermost last, and of the whole run
+        self._peaks = []
+        self._traced_peak = 0
+        if enabled:
+            self.enable(trace_memory)
+
+    def enable(self, trace_memory=False):
+        """
+        Start recording metrics
+        """
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        """
+        Stop recording metrics. Metrics recorded so far are kept
+        """
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def reset(self):
+        """
+        Forget every recorded metric (hooks stay registered)
+        """
+        self.stages = dict()
+        self.files = dict()
+        self._peaks = []
+        self._traced_peak = 0
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def add_hook(self, hook):
+        """
+        Register a function called as hook(kind, name, metrics) whenever a stage finishes
+        (kind 'stage', metrics {'seconds', 'peak_mb'}) or a file is processed (kind 'file', metrics
+        such as {'bytes', 'tokens', 'stopwords'})
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def stage(self, name):
+        """
+        Context manager timing a stage, e.g. `with INSTRUMENT.stage('tokenize'): ...`
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def _push_peak(self):
+        """
+        Start tracking the peak traced memory of a stage. tracemalloc has a single peak,
+        so the peak reached so far by the enclosing stage is saved before it is reset
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        self._traced_peak = max(self._traced_peak, peak)
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+    def _pop_peak(self):
+        """
+        Returns:
+            peak traced memory in MB since the matching _push_peak, also counted in the enclosing stage
+        """
+        if not self._peaks:
+            return None
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        return peak / 1e6
+
+    def record_stage(self, name, seconds, calls=1, peak_mb=None):
+        """
+        Add runs of a stage to its totals
+        """
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'peak_mb': None}
+        stats['calls'] += calls
+        stats['seconds'] += seconds
+        if peak_mb is not None:
+            stats['peak_mb'] = max(stats['peak_mb'] or 0.0, peak_mb)
+        for hook in self.hooks:
+            hook('stage', name, {'seconds': seconds, 'peak_mb': peak_mb})
+
+    def record_file(self, filepath, **metrics):
+        """
+        Record counts of one processed file, e.g. record_file(path, bytes=n, tokens=m, stopwords=k)
+        """
+        if not self.enabled:
+            return
+        self.files.setdefault(filepath, dict()).update(metrics)
+        for hook in self.hooks:
+            hook('file', filepath, metrics)
+
+    def snapshot(self):
+        """
+        Recorded metrics as a picklable dictionary (sent back by worker processes)
+        """
+        return {'stages': self.stages, 'files': self.files}
+
+    def merge(self, snapshot):
+        """
+        Add metrics recorded elsewhere, e.g. in a worker process, and pass them on to the hooks
+        """
+        for name, stats in snapshot['stages'].items():
+            self.record_stage(name, stats['seconds'], stats['calls'], stats['peak_mb'])
+        for filepath, metrics in snapshot['files'].items():
+            self.record_file(filepath, **metrics)
+
+    def report(self):
+        """
+        Returns:
+            dictionary with stage totals, per-file metrics, totals over files and peak memory
+        """
+        totals = dict()
+        for metrics in self.files.values():
+            for key, value in metrics.items():
+                totals[key] = totals.get(key, 0) + value
+        memory = {'peak_rss_mb': peak_rss_mb()}
+        if tracemalloc.is_tracing():
+            memory['peak_traced_mb'] = max(self._traced_peak, tracemalloc.get_traced_memory()[1]) / 1e6
+        return {'stages': self.stages, 'files': self.files,
+                'totals': dict(totals, files=len(self.files)), 'memory': memory}
+
+    def dump_json(self, path):
+        """
+        Write the report to a JSON file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def summary(self):
+        """
+        Returns:
+            the report as a text table, slowest stages first
+        """
+        report = self.report()
+        lines = [f"{'stage':<28} {'calls':>8} {'seconds':>10} {'ms/call':>10} {'peak MB':>9}"]
+        for name, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+            peak = f"{stats['peak_mb']:.1f}" if stats['peak_mb'] is not None else '-'
+            lines.append(f"{name:<28} {stats['calls']:>8} {stats['seconds']:>10.4f} "
+                         f"{1000 * stats['seconds'] / stats['calls']:>10.3f} {peak:>9}")
+        lines.append('')
+        lines.append(', '.join(f"{key}: {value}" for key, value in report['totals'].items()))
+        lines.append(', '.join(f"{key}: {value:.1f}" for key, value in report['memory'].items()
+                               if value is not None))
+        return '\n'.join(lines)
+
+
+# Instrumentation shared by the library, e.g. INSTRUMENT.enable(); ...; print(INSTRUMENT.summary())
+INSTRUMENT = Instrumentation()
@@ -0,0 +1,95 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_manifest.py
+description: Manifest of analyzed files (path, size, modification time, content hash) used to
+             find which files were added, changed or removed since the last run.
+"""
+
+import json
+import os
+
+from NLP_parse_cache import file_digest
+
+
+class Manifest:
+    def __init__(self, path=None):
+        """
+        Args:
+            path: JSON file the manifest is loaded from and saved to (in memory only if None)
+        """
+        self.path = path
+        # absolute file path --> {'size', 'mtime_ns', 'sha256', 'label'}
+        self.entries = dict()
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, filepath):
+        return os.path.abspath(filepath) in self.entries
+
+    def label(self, filepath):
+        """
+        Label a file was recorded under, or None
+        """
+        entry = self.entries.get(os.path.abspath(filepath))
+        return entry['label'] if entry is not None else None
+
+    def scan(self, filepaths):
+        """
+        Compare files with the manifest. Files whose size and modification time are unchanged
+        are not read; the others are hashed so that touched but identical files count as unchanged.
+        Args:
+            filepaths: paths of the files currently in the corpus
+        Returns:
+            tuple of (added, changed, removed, unchanged) lists of file paths. Removed paths
+            are the absolute paths recorded in the manifest
+        """
+        added, changed, unchanged = [], [], []
+        seen = set()
+        for filepath in filepaths:
+            path = os.path.abspath(filepath)
+            seen.add(path)
+            entry = self.entries.get(path)
+            if entry is None:
+                added.append(filepath)
+                continue
+
+            st = os.stat(path)
+            if st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']:
+                unchanged.append(filepath)
+            elif file_digest(path) == entry['sha256']:
+                entry['size'], entry['mtime_ns'] = st.st_size, st.st_mtime_ns
+                unchanged.append(filepath)
+            else:
+                changed.append(filepath)
+
+        removed = [path for path in self.entries if path not in seen]
+        return added, changed, removed, unchanged
+
+    def record(self, filepath, label):
+        """
+        Record the current state of a file
+        """
+        path = os.path.abspath(filepath)
+        st = os.stat(path)
+        self.entries[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                              'sha256': file_digest(path), 'label': label}
+
+    def forget(self, filepath):
+        """
+        Remove a file from the manifest
+        """
+        self.entries.pop(os.path.abspath(filepath), None)
+
+    def save(self, path=None):
+        """
+        Write the manifest to its JSON file (atomically)
+        """
+        path = path or self.path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,183 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_parse_cache.py
+description: Persistent content-addressed cache of parser results, so re-runs over
+             unchanged files skip parsing. Entries are keyed by file content, parser
+             and stopword set, stored as compressed marshal data and evicted LRU-first
+             once the cache grows past its size limit.
+"""
+
+from collections import Counter, OrderedDict
+import functools
+import hashlib
+import marshal
+import os
+import threading
+import zlib
+
+# Bump whenever parser output changes in a way that cached entries shouldn't survive
+CACHE_VERSION = 1
+
+_MAGIC = b'NLPC'
+_SUFFIX = '.bin'
+
+
+@functools.lru_cache(maxsize=32)
+def stopwords_digest(stopwords):
+    """
+    Hash a frozenset of stopwords independently of its iteration order
+    """
+    return hashlib.sha256('\n'.join(sorted(stopwords)).encode('utf-8')).hexdigest()
+
+
+def parser_identity(parser):
+    """
+    Name identifying a parser across runs, e.g. 'NLP_text_analyzer_lib.NLPTextAnalyzer.json_parser'
+    """
+    func = getattr(parser, '__func__', parser)
+    name = getattr(func, '__qualname__', None) or type(func).__qualname__
+    return f"{getattr(func, '__module__', '')}.{name}"
+
+
+def file_digest(filepath, block_size=1 << 20):
+    """
+    SHA-256 of a file's content, read in blocks
+    """
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, directory='.parse_cache', max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            directory: folder holding the cache entries, created if needed
+            max_bytes: total size of entries above which the least recently used are evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # key --> entry size, ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._size = 0
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith(_SUFFIX):
+                st = os.stat(os.path.join(directory, name))
+                files.append((st.st_mtime_ns, name[:-len(_SUFFIX)], st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+    def key(self, filepath, parser, stopwords):
+        """
+        Cache key of a file parsed by a given parser with a given stopword set
+        Args:
+            filepath: path of the file to parse
+            parser: parser function/method, or its parser_identity string
+            stopwords: frozenset of stopwords the parser will use
+        Returns:
+            hex digest string
+        """
+        if not isinstance(parser, str):
+            parser = parser_identity(parser)
+        parts = (str(CACHE_VERSION), str(marshal.version), parser,
+                 stopwords_digest(stopwords), file_digest(filepath))
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """
+        Look up cached parser results
+        Returns:
+            results dictionary, or None on a miss
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                blob = f.read()
+            if not blob.startswith(_MAGIC):
+                raise ValueError('not a parse cache entry')
+            results = marshal.loads(zlib.decompress(blob[len(_MAGIC):]))
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if 'wordcount' in results:
+            results['wordcount'] = Counter(results['wordcount'])
+
+        # Mark the entry as most recently used
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return results
+
+    def put(self, key, results):
+        """
+        Store parser results. Results that can't be serialized are silently not cached.
+        """
+        stored = {k: dict(v) if isinstance(v, Counter) else v for k, v in results.items()}
+        try:
+            blob = _MAGIC + zlib.compress(marshal.dumps(stored))
+        except ValueError:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(blob) - self._entries.pop(key, 0)
+            self._entries[key] = len(blob)
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes
+        """
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """
+        Remove every entry and reset the hit/miss counters
+        """
+        with self._lock:
+            for key in self._entries:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            dictionary with hits, misses, number of entries and total size in bytes
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'bytes': self._size}
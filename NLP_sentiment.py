@@ -0,0 +1,133 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_sentiment.py
+description: Pluggable sentiment backends for NLPTextAnalyzer. TextBlobSentiment scores each
+             document's text with TextBlob, LexiconSentiment scores whole batches of documents
+             at once from their word counts with a precomputed polarity/subjectivity lexicon.
+"""
+
+import numpy as np
+
+
+class TextBlobSentiment:
+    """ Scores one text at a time with TextBlob (the original behaviour) """
+    name = 'textblob'
+    batch = False
+
+    def score_text(self, text):
+        """
+        Returns:
+            tuple of (polarity, subjectivity)
+        """
+        from textblob import TextBlob
+        sentiment = TextBlob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+
+
+def textblob_lexicon():
+    """
+    Word-level lexicon behind TextBlob's default sentiment analyzer
+    Returns:
+        dictionary word --> (polarity, subjectivity), averaged over the word's senses
+    """
+    from textblob.en import sentiment as pattern_sentiment
+
+    # The lexicon loads lazily on first lookup
+    pattern_sentiment.get('good')
+    return {word: tuple(senses[None][:2]) for word, senses in dict.items(pattern_sentiment)
+            if None in senses}
+
+
+class LexiconSentiment:
+    """
+    Scores documents in batches from their word counts: polarity and subjectivity are the
+    averages over every occurrence of a lexicon word, as TextBlob does, but without TextBlob's
+    handling of modifiers ("very good"), negations ("not good") and emoticons.
+    """
+    name = 'lexicon'
+    batch = True
+
+    def __init__(self, lexicon=None):
+        """
+        Args:
+            lexicon: dictionary word --> (polarity, subjectivity). Defaults to TextBlob's lexicon
+        """
+        self.lexicon = lexicon if lexicon is not None else textblob_lexicon()
+        # Lexicon values aligned with the ids of the last vocabulary used
+        self._vocab = None
+        self._polarity = np.empty(0)
+        self._subjectivity = np.empty(0)
+        self._known = np.empty(0)
+
+    def _arrays(self, vocab):
+        """
+        Polarity, subjectivity and known-word arrays indexed by word id, extended as the vocabulary grows
+        """
+        if vocab is not self._vocab:
+            self._vocab = vocab
+            self._polarity = self._subjectivity = self._known = np.empty(0)
+
+        start = len(self._known)
+        if len(vocab) > start:
+            missing = (np.nan, np.nan)
+            scores = np.array([self.lexicon.get(word, missing) for word in vocab.words[start:]],
+                              dtype=np.float64).reshape(-1, 2)
+            known = ~np.isnan(scores[:, 0])
+            scores[~known] = 0.0
+            self._polarity = np.concatenate((self._polarity, scores[:, 0]))
+            self._subjectivity = np.concatenate((self._subjectivity, scores[:, 1]))
+            self._known = np.concatenate((self._known, known.astype(np.float64)))
+        return self._polarity, self._subjectivity, self._known
+
+    def score_counts(self, vocab, rows, ids, counts, n_docs):
+        """
+        Score many documents at once
+        Args:
+            vocab: Vocabulary the word ids refer to
+            rows, ids, counts: flattened (document position, word id, count) triples
+            n_docs: number of documents
+        Returns:
+            tuple of (polarity, subjectivity) arrays, one value per document
+        """
+        polarity, subjectivity, known = self._arrays(vocab)
+        weights = counts * known[ids]
+        n = np.bincount(rows, weights=weights, minlength=n_docs)
+        n[n == 0] = 1
+        return (np.bincount(rows, weights=counts * polarity[ids], minlength=n_docs) / n,
+                np.bincount(rows, weights=counts * subjectivity[ids], minlength=n_docs) / n)
+
+    def score_corpus(self, corpus, labels):
+        """
+        Score documents of an NLP_corpus.Corpus from their word counts
+        Returns:
+            tuple of (polarity, subjectivity) arrays aligned with labels
+        """
+        rows, ids, counts = corpus.gather_rows(labels)
+        return self.score_counts(corpus.vocab, rows, ids, counts, len(labels))
+
+    def score_text(self, text):
+        """
+        Score a single space-separated text
+        Returns:
+            tuple of (polarity, subjectivity)
+        """
+        scores = [self.lexicon[w] for w in (text.split(' ') if text else []) if w in self.lexicon]
+        if not scores:
+            return 0.0, 0.0
+        return (sum(p for p, _ in scores) / len(scores),
+                sum(s for _, s in scores) / len(scores))
+
+
+# Backends selectable by name
+BACKENDS = {'textblob': TextBlobSentiment, 'lexicon': LexiconSentiment}
+
+
+def get_backend(sentiment):
+    """
+    Turn a backend name, backend object or None (no sentiment) into a backend
+    """
+    if sentiment is None or not isinstance(sentiment, str):
+        return sentiment
+    if sentiment not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend {sentiment!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[sentiment]()
@@ -0,0 +1,77 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_stopwords.py
+description: Registry that loads each stopword file once and keeps it as a frozenset,
+             reloading a file only when its modification time changes.
+"""
+
+import os
+import threading
+
+
+class StopwordRegistry:
+    def __init__(self):
+        # absolute path --> (modification time in ns, frozenset of stopwords)
+        self._entries = dict()
+        self._lock = threading.Lock()
+
+    def get(self, stopfile):
+        """
+        Get the stopwords of a file, reading it only if it wasn't cached or changed since
+        Args:
+            stopfile (str): path of a stopword file with one word per line
+        Returns:
+            frozenset of stopwords
+        """
+        path = os.path.abspath(stopfile)
+        mtime = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+        with open(path, 'r') as f:
+            stopwords = frozenset(f.read().splitlines())
+
+        with self._lock:
+            self._entries[path] = (mtime, stopwords)
+        return stopwords
+
+    def invalidate(self, stopfile=None):
+        """
+        Drop one cached stopword file, or every cached file if none is given
+        """
+        with self._lock:
+            if stopfile is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(stopfile), None)
+
+    def resolve(self, stop_words):
+        """
+        Turn any supported stopwords argument into a frozenset
+        Args:
+            stop_words: path of a stopword file, an iterable of words, or None for no stopwords
+        Returns:
+            frozenset of stopwords
+        """
+        if stop_words is None:
+            return frozenset()
+        if isinstance(stop_words, (str, os.PathLike)):
+            return self.get(stop_words)
+        return frozenset(stop_words)
+
+    def merge(self, *sources):
+        """
+        Merge stopword files and/or custom collections of words into one set
+        Args:
+            sources: any number of stopword file paths or iterables of words
+        Returns:
+            frozenset with the union of all sources
+        """
+        return frozenset().union(*(self.resolve(source) for source in sources))
+
+
+# Registry shared by every analyzer in the process
+STOPWORDS = StopwordRegistry()
@@ -1,58 +1,180 @@
 """
 Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
 filename: NLP_text_analyzer_app.py
-description: Application of reusable library for Natural Language Processing
+description: Application of reusable library for Natural Language Processing. Runs headless as a
+             batch job: letters are read and parsed as a pipeline, and the Sankey diagram,
+             sentiment plot, word clouds and a timing summary are written to an output directory.
+             Example: python NLP_text_analyzer_app.py "data/Individual Letters" --output-dir output
 """
 
-import NLP_text_analyzer_lib as NLP
+import argparse
+from collections import Counter
+import json
 import os
-import pprint as pp # Pretty printer
-
-def main():
-
-    # Create NLP objects
-    authors = NLP.NLPTextAnalyzer()
-    letters = NLP.NLPTextAnalyzer()
-
-    # Define root directories for text files
-    letters_root_directory = 'data/Individual Letters'
-    grouped_letters_root_directory = 'data/Combined Letters'
-    letters_paths = letters.get_text_paths(letters_root_directory)
-    combined_paths = authors.get_text_paths(grouped_letters_root_directory)
-
-    for path in letters_paths:
-        try:
-            # Splitting path to get labels
-            label_parts = path.split(os.sep)
-            label = label_parts[-2] + ' ' + os.path.splitext(label_parts[-1])[0]
-            letters.load_text(path, label=label)
-        except Exception as e:
-            print(str(e))
-
-    for path in combined_paths:
-        try:
-            # Using basename to get the file name without extension
-            label = os.path.splitext(os.path.basename(path))[0]
-            authors.load_text(path, label=label)
-        except Exception as e:
-            print(str(e))
-
-    # Process the texts and get results
-    result = authors.load_all_text(letters_paths)
-
-    # Plot the Sankey diagram
-    authors.plot_sankey(result)
-
-    # # Combine .txt letters example usage:
-    # # folder_path = r"C:\Users\hafid\OneDrive\Documents\Classes\ds3500 Advanced Programming with Data\DS3500\HW\HW4\ds3500_hw4\data\Hazard Stevens"
-    # # authors.combine_txf_files_and_save(folder_path)
-
-    letters_fig = letters.get_sentiment_plot()
-    authors_fig = authors.get_sentiment_plot(isGroupedAuthor=True)
-    authors.plot_sentiment(letters_fig, authors_fig)
-    #
-    letters.generate_wordclouds_subplots()
+import sys
+
+import NLP_text_analyzer_lib as NLP
+from NLP_instrument import INSTRUMENT
+from NLP_manifest import Manifest
+from NLP_parse_cache import ParseCache
+
+# Parser choice --> (NLPTextAnalyzer parser method name or None for the default parser, file endings)
+PARSERS = {'default': (None, ('.txt',)),
+           'mmap': ('mmap_parser', ('.txt',)),
+           'mmap-counts': ('mmap_counts_parser', ('.txt',)),
+           'json': ('json_parser', ('.json',))}
+
+
+def letter_label(path):
+    """ Label an individual letter as '<author> <date>' from its path, or '<date>' for a
+    letter file given outside of an author directory """
+    author, text_name = NLP.NLPTextAnalyzer.split_author_text(path)
+    return f"{author} {text_name}" if author else text_name
+
+
+def save_sankey_input(path, result):
+    """ Write load_all_text's {'wordcount': {(author, text name): Counter}} dictionary as JSON """
+    entries = [[author, text_name, dict(counter)] for (author, text_name), counter in result['wordcount'].items()]
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(entries, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_sankey_input(path):
+    """ Read a dictionary written by save_sankey_input """
+    with open(path, 'r') as f:
+        entries = json.load(f)
+    return {'wordcount': {(author, text_name): Counter(counts) for author, text_name, counts in entries}}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Analyze letters laid out as <root>/<author>/<date>.txt and write a Sankey diagram, '
+                    'sentiment plot, word clouds and timing summary to an output directory.')
+    parser.add_argument('roots', nargs='*', default=['data/Individual Letters'],
+                        help='root directories of letters and/or letter files')
+    parser.add_argument('--stopwords', default=NLP.STOPWORDS_FILE, help='stopword file')
+    parser.add_argument('--parser', choices=list(PARSERS), default='default',
+                        help="'mmap-counts' keeps only word counts and needs --sentiment lexicon or none")
+    parser.add_argument('--sentiment', choices=['textblob', 'lexicon', 'none'], default='textblob')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: number of CPUs)')
+    parser.add_argument('--batch-size', type=int, default=16, help='files sent to a worker at a time')
+    parser.add_argument('--output-dir', default='output', help='directory the outputs are written to')
+    parser.add_argument('--cache', default='.parse_cache', help='parse cache directory')
+    parser.add_argument('--no-cache', action='store_true', help="don't use the parse cache")
+    parser.add_argument('--state', default=None,
+                        help='directory keeping the analysis, the authors and Sankey input built from it and a '
+                             'manifest of the letters between runs, so that only added, changed or removed '
+                             'letters are parsed and only their authors are scored again (use the same '
+                             '--parser and --sentiment on every run)')
+    parser.add_argument('--top-k', type=int, default=3, help='most common words of each letter in the Sankey diagram')
+    parser.add_argument('--wordclouds', choices=['letters', 'authors', 'none'], default='letters',
+                        help='draw a word cloud per letter, per author, or none')
+    parser.add_argument('--trace-memory', action='store_true', help='report the peak memory of each stage')
+    parser.add_argument('--show', action='store_true', help='also display the figures')
+    args = parser.parse_args(argv)
+    if args.parser == 'mmap-counts' and args.sentiment == 'textblob':
+        parser.error("--parser mmap-counts keeps no text to score with textblob, use --sentiment lexicon or none")
+    return args
+
+
+def main(argv=None):
+    """
+    Run the analysis
+    Returns:
+        exit status: 0, or 1 if some files couldn't be parsed (their errors are in errors.txt)
+    """
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    INSTRUMENT.enable(trace_memory=args.trace_memory)
+
+    # Create NLP object backed by an on-disk parse cache, so re-runs skip unchanged files
+    sentiment = None if args.sentiment == 'none' else args.sentiment
+    cache = None if args.no_cache else ParseCache(args.cache)
+    # Authors and the Sankey input, kept up to date rather than rebuilt in --state mode
+    authors = result = None
+    if args.state and os.path.exists(os.path.join(args.state, 'analyzer.json')):
+        # Reopen the previous run's analysis, memory-mapped, along with what was built from it
+        letters = NLP.NLPTextAnalyzer.load(args.state, cache=cache, sentiment=sentiment)
+        if os.path.exists(os.path.join(args.state, 'authors', 'analyzer.json')):
+            authors = NLP.NLPTextAnalyzer.load(os.path.join(args.state, 'authors'), sentiment=sentiment,
+                                               vocab=letters.corpus.vocab)
+        if os.path.exists(os.path.join(args.state, 'sankey.json')):
+            result = load_sankey_input(os.path.join(args.state, 'sankey.json'))
+    else:
+        letters = NLP.NLPTextAnalyzer(cache=cache, sentiment=sentiment)
+    parser_name, extensions = PARSERS[args.parser]
+    parser = getattr(letters, parser_name) if parser_name else None
+
+    if args.state:
+        # Only parse letters added or changed since the last run, drop removed ones, and
+        # update only their authors and Sankey entries
+        os.makedirs(args.state, exist_ok=True)
+        manifest = Manifest(os.path.join(args.state, 'manifest.json'))
+        paths = [path for root in args.roots
+                 for path in (letters.iter_text_paths(root, extensions) if os.path.isdir(root) else [root])]
+        with INSTRUMENT.stage('app.load'):
+            changes = letters.refresh(paths, manifest, labels=letter_label, parser=parser, workers=args.workers,
+                                      stop_words=args.stopwords, all_results=result,
+                                      groups=[authors] if authors is not None else ())
+        print(', '.join(f'{len(changes[key])} {key}' for key in ('added', 'changed', 'removed', 'failed')) +
+              f', {changes["unchanged"]} unchanged letters in {", ".join(args.roots)}')
+    else:
+        # Read files in a thread while worker processes parse them, labelling letters by author and date
+        with INSTRUMENT.stage('app.load'):
+            loaded = letters.load_pipeline(args.roots, labels=letter_label, parser=parser, workers=args.workers,
+                                           stop_words=args.stopwords, batch_size=args.batch_size,
+                                           extensions=extensions)
+        print(f'Loaded {loaded} letters from {", ".join(args.roots)}')
+
+    if letters.errors:
+        with open(os.path.join(args.output_dir, 'errors.txt'), 'w') as f:
+            for path, error in letters.errors.items():
+                f.write(f'{path}: {error!r}\n')
+        print(f'{len(letters.errors)} files could not be parsed, see errors.txt', file=sys.stderr)
+
+    # Roll letters up to authors; only the authors' sentiment is computed again
+    with INSTRUMENT.stage('app.aggregate'):
+        per_document = letters.sentiment is not None and not letters.sentiment.batch
+        if authors is None:
+            authors = letters.aggregate('author', text=per_document)
+        if letters.sentiment is not None and not per_document:
+            authors.score_documents()
+
+    # Group the letters' word counts by author and date, reusing what letters already parsed,
+    # and write the Sankey diagram
+    with INSTRUMENT.stage('app.sankey'):
+        if result is None:
+            result = letters.load_all_text(reuse=True)
+        letters.plot_sankey(result, k=args.top_k, show=args.show,
+                            output=os.path.join(args.output_dir, 'sankey.html'))
+
+    if args.state:
+        with INSTRUMENT.stage('app.save'):
+            letters.save(args.state)
+            authors.save(os.path.join(args.state, 'authors'))
+            save_sankey_input(os.path.join(args.state, 'sankey.json'), result)
+
+    if sentiment is not None:
+        with INSTRUMENT.stage('app.sentiment'):
+            letters_fig = letters.get_sentiment_plot()
+            authors_fig = authors.get_sentiment_plot(isGroupedAuthor=True)
+            letters.plot_sentiment(letters_fig, authors_fig, show=args.show,
+                                   output=os.path.join(args.output_dir, 'sentiment.html'))
+
+    if args.wordclouds != 'none':
+        with INSTRUMENT.stage('app.wordclouds'):
+            analyzer = letters if args.wordclouds == 'letters' else authors
+            analyzer.generate_wordclouds_subplots(workers=args.workers, show=args.show,
+                                                  output=os.path.join(args.output_dir, 'wordclouds.png'))
+
+    INSTRUMENT.dump_json(os.path.join(args.output_dir, 'timings.json'))
+    summary = INSTRUMENT.summary()
+    with open(os.path.join(args.output_dir, 'timings.txt'), 'w') as f:
+        f.write(summary + '\n')
+    print(summary)
+    return 1 if letters.errors else 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -6,32 +6,158 @@ description: An extensible reusable library for Natural Language Processing able
              to aid in the study of however many such files a user desires.
 """
 
-from collections import defaultdict, Counter
+from collections import defaultdict, deque, Counter
+import datetime
+import math
 import os
-import matplotlib.pyplot as plt
-import plotly.express as px
-import pandas as pd
-import sankey as sk
-from textblob import TextBlob
-import wordcloud as wc
+import numpy as np
 import json
+from concurrent.futures import ProcessPoolExecutor
+import queue
+import threading
+import time
 from NLPParserError import NLPParserError
+from NLP_tokenizer import (tokenize_file, tokenize_file_instrumented, tokenize_text_instrumented, tokenize_lines,
+                           remove_digits, iter_file_words, count_file_words)
+from NLP_stopwords import STOPWORDS
+from NLP_parse_cache import parser_identity
+from NLP_corpus import Corpus, CorpusData
+from NLP_index import InvertedIndex
+from NLP_sentiment import get_backend
+from NLP_instrument import INSTRUMENT
+
+# pandas, plotly, matplotlib, wordcloud, textblob and sankey_lib are imported by the methods
+# that use them, so that processes which only parse text (e.g. load_texts workers) start fast
+# Stopword file used when none is given
+STOPWORDS_FILE = 'data/stopwords.txt'
+
+# Sentiment plots with more points than this are drawn with WebGL
+WEBGL_POINTS = 1000
+
+# Record keys load_jsonl reads each document's text, author and date from by default
+JSONL_FIELDS = {'text': 'text', 'author': 'author', 'date': 'date'}
 
 
 class NLPTextAnalyzer:
-    def __init__(self):
-        # string  --> {filename/label --> statistics}, e.g.,
+    def __init__(self, cache=None, vocab=None, keep_tokens=True, sentiment='textblob'):
+        """
+        Args:
+            cache: optional NLP_parse_cache.ParseCache used to skip parsing unchanged files
+            vocab: optional NLP_corpus.Vocabulary shared with other analyzers
+            keep_tokens: keep each document's token stream so data['allwords'] is available.
+                         Turning it off roughly halves memory again when only counts are needed
+            sentiment: sentiment backend, 'textblob' (per document), 'lexicon' (batched lexicon
+                       lookups over word counts, see NLP_sentiment), a backend object, or None
+        """
+        # Documents are stored in a compact corpus (interned vocabulary, sparse word counts,
+        # statistics arrays). data exposes it as string --> {filename/label --> statistics}, e.g.,
         # "wordcounts" --> {"A": wc_A, "B": wc_B, ....}
-        self.data = defaultdict(dict)
-        self.wordcount_df = pd.DataFrame()
+        self.corpus = Corpus(vocab=vocab, keep_tokens=keep_tokens)
+        self.data = CorpusData(self.corpus)
+        # word --> postings of (label, count), kept up to date as documents are loaded
+        self.index = InvertedIndex(self.corpus)
+        self._wordcount_df = None
         self.paths = list()
+        # file path --> exception raised while parsing it with load_texts
+        self.errors = dict()
+        # absolute file path --> label it was loaded under
+        self.sources = dict()
+        # label --> {'path', 'author', 'date'} of documents loaded from files
+        self.metadata = dict()
+        self.cache = cache
+        self.sentiment = get_backend(sentiment)
+        # {'by', 'text'} of analyzers made by aggregate, None otherwise
+        self.grouping = None
+
+    @property
+    def wordcount_df(self):
+        """ Word count DataFrame, created empty on first use """
+        if self._wordcount_df is None:
+            import pandas as pd
+            self._wordcount_df = pd.DataFrame()
+        return self._wordcount_df
+
+    @wordcount_df.setter
+    def wordcount_df(self, df):
+        self._wordcount_df = df
 
     def _save_results(self, label, results):
         """
         Save parsed file statistics in the internal data dictionary
         """
-        for k, v in results.items():
-            self.data[k][label] = v
+        with INSTRUMENT.stage('save'):
+            self.data.save(label, results)
+
+    def score_sentiment(self, text):
+        """
+        Score the sentiment of a text with the analyzer's sentiment backend. Batch backends
+        score documents once they are saved (see score_documents), so nothing is computed here
+        Returns:
+            tuple of (polarity, subjectivity), or (None, None) if not computed here
+        """
+        if self.sentiment is None or self.sentiment.batch:
+            return None, None
+        return self.sentiment.score_text(text)
+
+    def score_documents(self, labels=None):
+        """
+        Score the sentiment of loaded documents with the analyzer's sentiment backend.
+        Batch backends score all documents at once from their stored word counts.
+        Args:
+            labels: labels to score, by default every document without a polarity yet
+        """
+        if self.sentiment is None:
+            return
+        if labels is None:
+            labels = [label for label in self.data['wordcount'] if label not in self.data['polarity']]
+        labels = list(labels)
+        if not labels:
+            return
+
+        with INSTRUMENT.stage('sentiment'):
+            if self.sentiment.batch:
+                polarity, subjectivity = self.sentiment.score_corpus(self.corpus, labels)
+            else:
+                scores = [self.sentiment.score_text(self.data['allwords'].get(label, '')) for label in labels]
+                polarity, subjectivity = zip(*scores)
+            self.corpus.set_column(labels, 'polarity', polarity)
+            self.corpus.set_column(labels, 'subjectivity', subjectivity)
+
+    def validate_sentiment(self, labels=None, reference='textblob'):
+        """
+        Compare the analyzer's sentiment scores with a reference backend's, e.g. to see how far
+        the fast lexicon backend deviates from TextBlob on a corpus
+        Args:
+            labels: labels to compare (defaults to every document with a polarity and its words)
+            reference: reference backend name or object, scored on each document's words
+        Returns:
+            DataFrame with the scores and absolute errors per document, and a dictionary
+            summarizing mean/max absolute errors and correlations
+        """
+        import pandas as pd
+
+        reference = get_backend(reference)
+        if labels is None:
+            labels = [label for label in self.data['polarity'] if label in self.data['allwords']]
+
+        rows = []
+        for label in labels:
+            ref_polarity, ref_subjectivity = reference.score_text(self.data['allwords'][label])
+            rows.append({'Label': label,
+                         'Polarity': self.data['polarity'][label], 'ReferencePolarity': ref_polarity,
+                         'Subjectivity': self.data['subjectivity'][label],
+                         'ReferenceSubjectivity': ref_subjectivity})
+        df = pd.DataFrame(rows, columns=['Label', 'Polarity', 'ReferencePolarity',
+                                         'Subjectivity', 'ReferenceSubjectivity'])
+        df['PolarityError'] = (df['Polarity'] - df['ReferencePolarity']).abs()
+        df['SubjectivityError'] = (df['Subjectivity'] - df['ReferenceSubjectivity']).abs()
+
+        summary = {'documents': len(df)}
+        for name in ('Polarity', 'Subjectivity'):
+            summary[f'{name.lower()}_mean_error'] = float(df[f'{name}Error'].mean())
+            summary[f'{name.lower()}_max_error'] = float(df[f'{name}Error'].max())
+            summary[f'{name.lower()}_correlation'] = float(df[name].corr(df[f'Reference{name}']))
+        return df, summary
 
     @NLPParserError.check_file_format
     def _default_parser(self, filepath, stop_words):
@@ -39,50 +165,57 @@ class NLPTextAnalyzer:
         Default parser that removes common punctuations, turns all text to lowercase, removes any numbers
         in text, removes common stopwords, and computes statistics such as words count, num. words, etc
         """
-        PUNC = [" ", "(", ")", '"', '?', '[', ']', '', '.', '&', '\\', '\\\\', ',', '//', '//',
-                '\\', '\\\\', '!']
-        text = []
-        all_text = ''
-
-        # Read data from text files
-        with open(filepath, 'r') as f:
-            for line in f.readlines():
-                text.append(line.strip())
-
-        # Remove Punctuation
-        for i in range(len(text)):
-            for ele in text[i]:
-                if ele in PUNC:
-                    text[i] = text[i].replace(ele, ",")
-            all_text += text[i].lower()
-
-        word_list = all_text.split(',')
-
-        # Remove numbers
-        for i in range(len(word_list)):
-            word_list[i] = ''.join([j for j in word_list[i] if not j.isdigit()])
-
-        # Remove empty characters
-        while '' in word_list:
-            word_list.remove('')
+        # Tokenize in one pass: punctuation splitting, lowercasing, digit and stopword removal
+        stopwords = self.load_stop_words(stopfile=stop_words)
+        if INSTRUMENT.enabled:
+            word_list = tokenize_file_instrumented(filepath, stopwords, INSTRUMENT)
+        else:
+            word_list = tokenize_file(filepath, stopwords)
+        return self._word_results(word_list)
 
-        # Remove stopwords
+    def mmap_parser(self, filepath, stop_words):
+        """
+        Parser giving the same results as the default parser, tokenizing the file chunk by chunk
+        from a memory map rather than reading it into a list of lines and one joined string
+        """
+        stopwords = self.load_stop_words(stopfile=stop_words)
+        word_list = []
+        with INSTRUMENT.stage('tokenize'):
+            for words in iter_file_words(filepath, stopwords):
+                word_list += words
+        if INSTRUMENT.enabled:
+            INSTRUMENT.record_file(filepath, bytes=os.path.getsize(filepath), tokens=len(word_list))
+        return self._word_results(word_list)
+
+    def mmap_counts_parser(self, filepath, stop_words):
+        """
+        Memory-mapped parser keeping only the words count and num. words, counted chunk by chunk,
+        so memory use stays the same whatever the file size. Since no text is kept, sentiment
+        needs a batch backend scoring word counts, e.g. NLPTextAnalyzer(sentiment='lexicon')
+        """
         stopwords = self.load_stop_words(stopfile=stop_words)
-        for w in stopwords:
-            while w in word_list:
-                word_list.remove(w)
+        with INSTRUMENT.stage('tokenize'):
+            wordcount, numwords = count_file_words(filepath, stopwords)
+        if INSTRUMENT.enabled:
+            INSTRUMENT.record_file(filepath, bytes=os.path.getsize(filepath), tokens=numwords)
+        return {'wordcount': wordcount, 'numwords': numwords}
 
+    def _word_results(self, word_list):
+        """
+        Statistics of a document's words (words count, num. words, sentiment, words string)
+        """
         # Join words list elts to string
         words_string = ' '.join(word_list)
 
-        # Instantiate TextBlob object with words string to get sentiment scores
-        blob = TextBlob(words_string)
+        # Get sentiment scores of the words string
+        with INSTRUMENT.stage('sentiment'):
+            polarity, subjectivity = self.score_sentiment(words_string)
 
         # Construct results dict
         results = {'wordcount': Counter(word_list),
                    'numwords': len(word_list),
-                   'polarity': blob.sentiment.polarity,
-                   'subjectivity': blob.sentiment.subjectivity,
+                   'polarity': polarity,
+                   'subjectivity': subjectivity,
                    'allwords': words_string}
         return results
 
@@ -92,45 +225,42 @@ class NLPTextAnalyzer:
         Simple json parser that turns all text to lowercase, removes any numbers in text,
         removes common stopwords, and computes statistics such as words count, num. words, etc
         """
-        f = open(filepath)
-        raw = json.load(f)
-        text = raw['text']
-        words = text.split(" ")
+        with INSTRUMENT.stage('read'):
+            with open(filepath) as f:
+                raw = json.load(f)
+                size = os.fstat(f.fileno()).st_size
+            text = raw['text']
+            words = text.split(" ")
 
         # Remove stopwords
-        stopwords = self.load_stop_words(stopfile=stop_words)
-        for w in stopwords:
-            while w in words:
-                words.remove(w)
+        with INSTRUMENT.stage('stopwords'):
+            stopwords = self.load_stop_words(stopfile=stop_words)
+            n_words = len(words)
+            words = [w for w in words if w not in stopwords]
 
         # Remove numbers
-        for i in range(len(words)):
-            words[i] = ''.join([j for j in words[i] if not j.isdigit()])
-
-        # Join words list elts to string
-        words_string = ' '.join(words)
+        with INSTRUMENT.stage('digits'):
+            words = [remove_digits(w) for w in words]
 
-        # Instantiate TextBlob object with words string to get sentiment scores
-        blob = TextBlob(words_string)
+        if INSTRUMENT.enabled:
+            INSTRUMENT.record_file(filepath, bytes=size, tokens=len(words), stopwords=n_words - len(words))
+        return self._word_results(words)
 
-        # Construct results dict
-        results = {'wordcount': Counter(words),
-                   'numwords': len(words),
-                   'polarity': blob.sentiment.polarity,
-                   'subjectivity': blob.sentiment.subjectivity,
-                   'allwords': words_string}
-        f.close()
-        return results
+    def _record_results(self, text, stopwords):
+        """
+        Parse the text of a JSON Lines record like a text file read by the default parser
+        """
+        with INSTRUMENT.stage('tokenize'):
+            word_list = tokenize_lines(text.split('\n'), stopwords)
+        return self._word_results(word_list)
 
-    def load_text(self, filename, label=None, parser=None):
+    def load_text(self, filename, label=None, parser=None, stop_words=STOPWORDS_FILE):
         """ Registers a text document with the framework
         Extracts and stores data to be used in later
-        visualizations. """
+        visualizations. Stop words can be a stopword file path
+        or a custom set of words (see NLP_stopwords). """
 
-        if parser is None:
-            results = self._default_parser(filename, 'data/stopwords.txt')
-        else:
-            results = parser(filename, 'data/stopwords.txt')
+        results = self._parse(filename, parser, stop_words)
 
         if label is None:
             label = filename
@@ -138,220 +268,1051 @@ class NLPTextAnalyzer:
         # store the results of processing one file
         # in the internal state (data)
         self._save_results(label, results)
+        self._register_source(filename, label)
+        if self.sentiment is not None and self.sentiment.batch:
+            self.score_documents([label])
+
+    def load_texts(self, paths, labels=None, parser=None, workers=None, stop_words=STOPWORDS_FILE):
+        """
+        Parse many text documents in a process pool and register them with the framework.
+        Results are saved in the same order as the given paths, whatever order workers finish in.
+        Args:
+            paths: list of file paths to parse
+            labels: list of labels aligned with paths, or a function mapping a path to its label.
+                    Defaults to the file path, as in load_text
+            parser: parser to use instead of the default one. Must be picklable, i.e. a
+                    module-level function or a parser method of this class
+            workers: number of worker processes (defaults to the number of CPUs).
+                     With 1 worker files are parsed in the current process
+            stop_words: stopword file path or custom set of stopwords
+        Returns:
+            dictionary of file path --> exception raised while parsing that file
+        """
+        paths = list(paths)
+        if labels is None:
+            labels = paths
+        elif callable(labels):
+            labels = [labels(path) for path in paths]
+
+        # Look files up in the parse cache first, only sending misses to the workers
+        outcomes = [None] * len(paths)
+        keys = [None] * len(paths)
+        with INSTRUMENT.stage('cache'):
+            if self.cache is not None:
+                stopwords = self.load_stop_words(stop_words)
+                identity = self._parser_key(parser or self._default_parser)
+                for i, path in enumerate(paths):
+                    try:
+                        keys[i] = self.cache.key(path, identity, stopwords)
+                    except OSError:
+                        continue
+                    results = self.cache.get(keys[i])
+                    if results is not None:
+                        outcomes[i] = (results, None)
+        todo = [i for i, outcome in enumerate(outcomes) if outcome is None]
+
+        # Parser methods of this instance are sent by name so the instance data isn't pickled
+        if getattr(parser, '__self__', None) is self:
+            parser = parser.__name__
+
+        # Batch sentiment backends score documents after they are saved, not in the workers
+        sentiment = None if self.sentiment is None or self.sentiment.batch else self.sentiment
+        workers = workers or os.cpu_count() or 1
+        in_process = workers == 1 or len(todo) <= 1
+        # Workers send their metrics back when instrumentation is on
+        instrument = INSTRUMENT.trace_memory if INSTRUMENT.enabled and not in_process else None
+        tasks = [(paths[i], parser, stop_words, sentiment, instrument) for i in todo]
+
+        with INSTRUMENT.stage('parse'):
+            if in_process:
+                parsed = list(map(_parse_task, tasks))
+            else:
+                chunksize = max(1, len(tasks) // (workers * 4))
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    parsed = list(pool.map(_parse_task, tasks, chunksize=chunksize))
+
+        for i, (results, error, metrics) in zip(todo, parsed):
+            outcomes[i] = (results, error)
+            if metrics is not None:
+                INSTRUMENT.merge(metrics)
+            if keys[i] is not None and error is None:
+                self.cache.put(keys[i], results)
+
+        self._collect_parsed(paths, labels, outcomes)
+        if self.sentiment is not None and self.sentiment.batch:
+            self.score_documents()
+        return self.errors
+
+    def load_pipeline(self, sources, labels=None, parser=None, workers=None, stop_words=STOPWORDS_FILE,
+                      batch_size=16, prefetch=None, extensions=('.txt',)):
+        """
+        Discover, read and parse text files as a pipeline: a reader thread walks the sources and
+        reads files (or finds them in the parse cache) while worker processes parse the batches
+        already read. Results are saved batch by batch in discovery order.
+        Args:
+            sources: root directories laid out as <root>/<author>/<text name>.txt (see
+                     iter_text_paths) and/or file paths
+            labels: function mapping a path to its label. Defaults to the file path
+            parser: as in load_texts. With the default parser the reader thread reads the text
+                    and workers only tokenize it, other parsers read their files in the workers
+            workers: number of worker processes (defaults to the number of CPUs).
+                     With 1 worker files are parsed in the current process
+            stop_words: stopword file path or custom set of stopwords
+            batch_size: number of files sent to a worker at a time
+            prefetch: number of batches read ahead of the workers (defaults to 2 per worker)
+            extensions: file name endings of the files found in root directories
+        Returns:
+            number of documents loaded. Files that can't be read, parsed or labelled are
+            recorded in self.errors
+        """
+        workers = workers or os.cpu_count() or 1
+        batches = queue.Queue(maxsize=prefetch or 2 * workers)
+        stop = threading.Event()
+        # Filled in by the reader thread: exception raised, files read and seconds spent reading
+        reading = {'error': None, 'files': 0, 'seconds': 0.0}
+        reader = threading.Thread(target=self._read_sources, daemon=True,
+                                  args=(sources, extensions, parser, stop_words, batch_size, batches, stop, reading))
+
+        # Parser methods of this instance are sent by name so the instance data isn't pickled
+        if getattr(parser, '__self__', None) is self:
+            parser = parser.__name__
+        # Batch sentiment backends score documents after they are saved, not in the workers
+        sentiment = None if self.sentiment is None or self.sentiment.batch else self.sentiment
+        instrument = INSTRUMENT.trace_memory if INSTRUMENT.enabled and workers > 1 else None
+
+        def tasks(batch):
+            return ([(path, text, size) for path, text, size, _, results, error in batch
+                     if results is None and error is None], parser, stop_words, sentiment, instrument)
+
+        loaded = 0
+        reader.start()
+        try:
+            with INSTRUMENT.stage('pipeline'):
+                if workers == 1:
+                    for batch in iter(batches.get, None):
+                        loaded += self._save_batch(batch, _parse_batch(tasks(batch)), labels)
+                else:
+                    # Keep a few batches in flight so workers stay busy while the reader runs ahead
+                    pending = deque()
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        for batch in iter(batches.get, None):
+                            pending.append((batch, pool.submit(_parse_batch, tasks(batch))))
+                            if len(pending) >= 2 * workers:
+                                batch, future = pending.popleft()
+                                loaded += self._save_batch(batch, future.result(), labels)
+                        while pending:
+                            batch, future = pending.popleft()
+                            loaded += self._save_batch(batch, future.result(), labels)
+        finally:
+            stop.set()
+            reader.join()
+        # Recorded here since stages aren't thread-safe
+        if INSTRUMENT.enabled and reading['files']:
+            INSTRUMENT.record_stage('pipeline.read', reading['seconds'], calls=reading['files'])
+        if reading['error'] is not None:
+            raise reading['error']
+        return loaded
+
+    def _read_sources(self, sources, extensions, parser, stop_words, batch_size, batches, stop, reading):
+        """
+        Reader thread of load_pipeline: put batches of (path, text, file size, cache key, cached
+        results, error) tuples in the batches queue, then None. The text is only read for the default
+        parser and cached results are only looked up when the analyzer has a cache. Reading
+        statistics and any exception raised are left in the reading dictionary
+        """
+        def put(item):
+            # Give up once load_pipeline stopped, e.g. on an error
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            if isinstance(sources, (str, os.PathLike)):
+                sources = [sources]
+            if self.cache is not None:
+                stopwords = self.load_stop_words(stop_words)
+                identity = self._parser_key(parser or self._default_parser)
+
+            batch = []
+            for source in sources:
+                paths = self.iter_text_paths(source, extensions) if os.path.isdir(source) else [source]
+                for path in paths:
+                    text = size = key = results = error = None
+                    start = time.perf_counter()
+                    try:
+                        if self.cache is not None:
+                            key = self.cache.key(path, identity, stopwords)
+                            results = self.cache.get(key)
+                        if results is None and parser is None:
+                            with open(path, 'r') as f:
+                                size = os.fstat(f.fileno()).st_size
+                                text = f.read()
+                    except (OSError, UnicodeDecodeError) as e:
+                        error = e
+                    reading['seconds'] += time.perf_counter() - start
+                    reading['files'] += 1
+                    batch.append((path, text, size, key, results, error))
+                    if len(batch) == batch_size:
+                        if not put(batch):
+                            return
+                        batch = []
+            if batch:
+                put(batch)
+        except BaseException as e:
+            # Raised again by load_pipeline
+            reading['error'] = e
+        finally:
+            put(None)
+
+    def _save_batch(self, batch, outcomes, labels):
+        """
+        Save the results of a load_pipeline batch, cached or parsed by a worker
+        Returns:
+            number of documents saved
+        """
+        parsed = iter(outcomes)
+        saved = []
+        for path, _, _, key, results, error in batch:
+            if results is None and error is None:
+                results, error, metrics = next(parsed)
+                if metrics is not None:
+                    INSTRUMENT.merge(metrics)
+                if key is not None and error is None:
+                    self.cache.put(key, results)
+            if error is None:
+                try:
+                    label = labels(path) if labels is not None else path
+                except Exception as e:
+                    error = e
+            if error is not None:
+                self.errors[path] = error
+                continue
+            self._save_results(label, results)
+            self._register_source(path, label)
+            saved.append(label)
+        if saved and self.sentiment is not None and self.sentiment.batch:
+            self.score_documents(saved)
+        return len(saved)
+
+    def load_jsonl(self, filepath, fields=None, labels=None, batch_size=1000, workers=1,
+                   stop_words=STOPWORDS_FILE):
+        """
+        Stream a JSON Lines (NDJSON) file holding one document per line, e.g.
+        {"author": "Hazard Stevens", "date": "1862-5-1", "text": "..."}. Records are read one
+        at a time, tokenized in batches like text files by the default parser and saved batch
+        by batch, so memory use doesn't grow with the size of the file.
+        Args:
+            filepath: path of the JSON Lines file
+            fields: record keys to read the 'text', 'author' and 'date' from, overriding
+                    JSONL_FIELDS, e.g. {'text': 'body'}. A list of authors is joined with ', '
+            labels: function record --> label. Defaults to '<author> <date>' when the record
+                    has both ('<author> <date>:<line number>' for later records of the same
+                    author and date), '<file name>:<line number>' otherwise. Records given a
+                    label already used in the file are recorded in self.errors
+            batch_size: number of records parsed at a time
+            workers: number of worker processes parsing batches (1 parses in this process)
+            stop_words: stopword file path or custom set of stopwords
+        Returns:
+            number of documents loaded. Records that can't be read or parsed are recorded in
+            self.errors under '<file path>:<line number>'
+        """
+        fields = dict(JSONL_FIELDS, **(fields or {}))
+
+        # Batch sentiment backends score documents after they are saved, not while parsing
+        sentiment = None if self.sentiment is None or self.sentiment.batch else self.sentiment
+        batches = self._read_jsonl(filepath, fields, labels, batch_size)
+
+        loaded = 0
+        if workers == 1:
+            for batch in batches:
+                texts = [text for _, text, _ in batch]
+                loaded += self._save_records(batch, _parse_records((texts, stop_words, sentiment, None)))
+            return loaded
+
+        # Workers send their metrics back when instrumentation is on
+        instrument = INSTRUMENT.trace_memory if INSTRUMENT.enabled else None
+
+        # Keep a few batches in flight so workers stay busy without reading ahead unboundedly
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch in batches:
+                texts = [text for _, text, _ in batch]
+                pending.append((batch, pool.submit(_parse_records, (texts, stop_words, sentiment, instrument))))
+                if len(pending) >= 2 * workers:
+                    batch, future = pending.popleft()
+                    loaded += self._save_records(batch, future.result())
+            while pending:
+                batch, future = pending.popleft()
+                loaded += self._save_records(batch, future.result())
+        return loaded
+
+    def _read_jsonl(self, filepath, fields, labels, batch_size):
+        """
+        Read a JSON Lines file one record at a time
+        Returns:
+            generator of batches, lists of (label, text, metadata) tuples
+        """
+        name = os.path.basename(filepath)
+        # Labels given to the file's records so far, so that no record overwrites another
+        seen = set()
+        batch = []
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    with INSTRUMENT.stage('jsonl.read'):
+                        record = json.loads(line)
+                        text = record[fields['text']]
+                        author = record.get(fields['author'])
+                        date = record.get(fields['date'])
+                        if isinstance(author, list):
+                            author = ', '.join(map(str, author))
+                        if labels is not None:
+                            label = labels(record)
+                            if label in seen:
+                                raise ValueError(f"Duplicate label {label!r}")
+                        elif author and date:
+                            label = f"{author} {date}"
+                            if label in seen:
+                                label = f"{label}:{line_no}"
+                        else:
+                            label = f"{name}:{line_no}"
+                        seen.add(label)
+                except (ValueError, LookupError, TypeError, AttributeError) as e:
+                    self.errors[f"{filepath}:{line_no}"] = e
+                    continue
+
+                metadata = {'source': filepath, 'line': line_no, 'author': author,
+                            'date': parse_date(date) if isinstance(date, str) else None}
+                batch.append((label, text, metadata))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _save_records(self, batch, parsed):
+        """
+        Save the parse outcomes of a batch of JSON Lines records
+        Args:
+            batch: list of (label, text, metadata) tuples
+            parsed: tuple of (outcomes, metrics) returned by _parse_records
+        Returns:
+            number of documents saved
+        """
+        outcomes, metrics = parsed
+        if metrics is not None:
+            INSTRUMENT.merge(metrics)
+        saved = []
+        for (label, _, metadata), (results, error) in zip(batch, outcomes):
+            if error is not None:
+                self.errors[f"{metadata['source']}:{metadata['line']}"] = error
+                continue
+            self._save_results(label, results)
+            self.metadata[label] = metadata
+            saved.append(label)
+        if saved and self.sentiment is not None and self.sentiment.batch:
+            self.score_documents(saved)
+        return len(saved)
+
+    def _collect_parsed(self, paths, labels, outcomes):
+        """
+        Save parse outcomes in path order and record failed files in self.errors
+        """
+        for path, label, (results, error) in zip(paths, labels, outcomes):
+            if error is not None:
+                self.errors[path] = error
+            else:
+                self._save_results(label, results)
+                self._register_source(path, label)
+
+    def _parse(self, filepath, parser=None, stop_words=STOPWORDS_FILE):
+        """
+        Parse one file with the given parser (default parser if None), going through
+        the parse cache when the analyzer has one
+        """
+        if parser is None:
+            parser = self._default_parser
+        if self.cache is None:
+            return parser(filepath, stop_words)
+
+        key = self.cache.key(filepath, self._parser_key(parser), self.load_stop_words(stop_words))
+        results = self.cache.get(key)
+        if results is None:
+            results = parser(filepath, stop_words)
+            self.cache.put(key, results)
+        return results
+
+    def _parser_key(self, parser):
+        """
+        Parse cache identity of a parser combined with the sentiment scoring it does
+        """
+        if self.sentiment is None or self.sentiment.batch:
+            tag = 'none'
+        else:
+            tag = getattr(self.sentiment, 'name', type(self.sentiment).__name__)
+        return f"{parser_identity(parser)}+{tag}"
 
     @staticmethod
     def load_stop_words(stopfile=None):
-        """ Load stop words"""
-        if stopfile:
-            with open(stopfile, 'r') as f:
-                stopwords = f.read().splitlines()
-        return stopwords
+        """ Load stop words as a frozenset. Files are read once per process and reloaded
+        only when modified. Custom collections of words are returned as a frozenset. """
+        return STOPWORDS.resolve(stopfile)
 
-    def load_all_text(self, filepaths, parser=None):
+    def load_all_text(self, filepaths=None, parser=None, stop_words=STOPWORDS_FILE, reuse=False):
         """ Load and combine texts from multiple files, organizing by author and text name
+        Args:
+            filepaths: list of text file paths, laid out as .../<author>/<text name>.txt.
+                       Defaults to every file this analyzer loaded, whose word counts are
+                       read from the corpus without parsing anything (e.g. after load)
+            parser: parser used for files that have to be parsed
+            stop_words: stopword file path or custom set of stopwords
+            reuse: False to parse every file, True to reuse word counts this analyzer already
+                   loaded for a path, or a list of analyzers (this one included) whose loaded
+                   word counts are reused. Files not found in any of them are parsed.
+        Returns:
+            dictionary {'wordcount': {(author, text name): Counter}}
         """
         all_results = {'wordcount': {}}
 
+        if filepaths is None:
+            # Documents loaded from files, whatever directory the analyzer was saved from
+            for label, metadata in self.metadata.items():
+                if 'path' in metadata and label in self.data['wordcount']:
+                    author_text_key = self.split_author_text(metadata['path'])
+                    counter = all_results['wordcount'].setdefault(author_text_key, Counter())
+                    counter.update(self.data['wordcount'][label])
+            return all_results
+
+        if reuse is True:
+            analyzers = [self]
+        elif reuse:
+            analyzers = [self] + [a for a in reuse if a is not self]
+        else:
+            analyzers = []
+
         for filepath in filepaths:
+            author_text_key = self.split_author_text(filepath)
 
-            # Split the file path to get the author and text name
-            parts = filepath.split(os.sep)
+            if author_text_key not in all_results['wordcount']:
+                all_results['wordcount'][author_text_key] = Counter()
 
-            # NEED TO USE IF STATEMENTS TO MAKE SURE CODE RUNS FOR BOTH WINDOWS AND MAC USERS
-            # FOR MAC USERS PARTS WILL HAVE 4 ELTS AND FOR WINDOWS USERS IT WILL HAVE 3 ELTS
-            if len(parts) == 4:
-                author = parts[2]
-                text_name = parts[3].split('.')[0]
-                author_text_key = (author, text_name)
+            wordcount = self._loaded_wordcount(filepath, analyzers)
+            if wordcount is None:
+                wordcount = self._parse(filepath, parser, stop_words)['wordcount']
 
-                if author_text_key not in all_results['wordcount']:
-                    all_results['wordcount'][author_text_key] = Counter()
+            # Combine word counts for this author and text
+            all_results['wordcount'][author_text_key].update(wordcount)
+        return all_results
 
-                if parser is None:
-                    results = self._default_parser(filepath, 'data/stopwords.txt')
-                else:
-                    results = parser(filepath, 'data/stopwords.txt')
+    def aggregate(self, by='author', text=False):
+        """
+        Roll per-document results up into groups by merging word counts and summing
+        number of words, without re-tokenizing anything
+        Args:
+            by: 'author', 'date', 'year', 'month' or a function (label, metadata) --> group name.
+                Documents without a value for the group key are left out
+            text: if True, also build each group's combined text ('allwords') from its
+                  documents and score its sentiment. Otherwise sentiment isn't computed
+        Returns:
+            new NLPTextAnalyzer holding one entry per group, labelled by group name
+        """
+        group_of = self._group_function(by)
+
+        # group name --> member labels, in load order
+        groups = defaultdict(list)
+        for label in self.data['wordcount']:
+            group = group_of(label, self.metadata.get(label, {}))
+            if group is not None:
+                groups[group].append(label)
 
-                # Combine word counts for this author and text
-                all_results['wordcount'][author_text_key].update(results['wordcount'])
+        # Groups share this analyzer's vocabulary so merged word ids need no translation
+        grouped = NLPTextAnalyzer(cache=self.cache, vocab=self.corpus.vocab, sentiment=self.sentiment)
+        grouped.grouping = {'by': by, 'text': text}
+        for group, labels in groups.items():
+            self._build_group(grouped, group, labels)
 
-            elif len(parts) == 3:
-                author = parts[1]
-                text_name = parts[2].split('.')[0]
-                author_text_key = (author, text_name)
+        if text:
+            grouped.score_documents()
+        return grouped
 
-                if author_text_key not in all_results['wordcount']:
-                    all_results['wordcount'][author_text_key] = Counter()
+    @staticmethod
+    def _group_function(by):
+        """
+        Group key function (label, metadata) --> group name for a group key name or function
+        """
+        if callable(by):
+            return by
+        if by in GROUP_KEYS:
+            return GROUP_KEYS[by]
+        raise ValueError(f"Unknown group key {by!r}, expected one of {sorted(GROUP_KEYS)}")
 
-                if parser is None:
-                    results = self._default_parser(filepath, 'data/stopwords.txt')
+    def _build_group(self, grouped, group, labels):
+        """
+        (Re)compute one group of an analyzer made by aggregate from its member labels
+        """
+        by, text = grouped.grouping['by'], grouped.grouping['text']
+        ids, counts = self.corpus.merge_rows(labels)
+        numwords = sum(self.data['numwords'].get(label, 0) for label in labels)
+
+        polarity = subjectivity = words_string = None
+        if text:
+            words_string = ' '.join(self.data['allwords'][label] for label in labels
+                                    if self.data['allwords'].get(label))
+            polarity, subjectivity = self.score_sentiment(words_string)
+
+        grouped.corpus.add_counts(group, ids, counts, numwords=numwords, polarity=polarity,
+                                  subjectivity=subjectivity, allwords=words_string)
+        grouped.metadata[group] = {'group': by, 'members': labels}
+        if isinstance(by, str):
+            grouped.metadata[group][by] = group
+
+    def remove_document(self, label):
+        """
+        Remove a loaded document and everything recorded about it
+        """
+        if label in self.corpus:
+            self.corpus.remove(label)
+        for values in self.data.extras.values():
+            values.pop(label, None)
+        metadata = self.metadata.pop(label, None)
+        if metadata is not None and 'path' in metadata:
+            self.sources.pop(os.path.abspath(metadata['path']), None)
+
+    def refresh(self, paths, manifest, labels=None, parser=None, workers=None,
+                stop_words=STOPWORDS_FILE, all_results=None, groups=(), reload=False):
+        """
+        Incrementally bring the analyzer up to date with a set of files: only files added or
+        changed since the manifest was recorded are parsed, and removed files are dropped.
+        Sankey inputs and aggregated groups passed in are updated in place, touching only the
+        entries of the files that changed.
+        The analyzer must hold the documents the manifest records, so a job running in a new
+        process each time saves the analyzer with the manifest (save(path)) and reopens it with
+        NLPTextAnalyzer.load(path) before refreshing. A fresh analyzer would have to parse every
+        recorded file again, which is refused unless reload is True.
+        Args:
+            paths: root directory (see get_text_paths) or list of file paths currently in the corpus
+            manifest: NLP_manifest.Manifest of the files analyzed so far. Saved at the end
+            labels: function mapping a path to its label (defaults to the path)
+            parser, workers, stop_words: as in load_texts
+            all_results: {'wordcount': {(author, text name): Counter}} dictionary, e.g. from
+                         load_all_text, to keep up to date
+            groups: analyzers made by this analyzer's aggregate() to keep up to date
+            reload: parse again the unchanged files recorded in the manifest but not loaded in
+                    this analyzer, instead of raising ValueError
+        Returns:
+            dictionary with the 'added', 'changed', 'removed', 'reloaded' and 'failed' file
+            paths and the number of 'unchanged' files (not counting reloaded ones)
+        """
+        if isinstance(paths, (str, os.PathLike)):
+            paths = self.get_text_paths(paths)
+        added, changed, removed, unchanged = manifest.scan(paths)
+
+        # Files recorded in the manifest but not loaded in this analyzer (e.g. a new process)
+        missing = [path for path in unchanged if manifest.label(path) not in self.corpus]
+        if missing and not reload:
+            raise ValueError(f"{len(missing)} files recorded in the manifest aren't loaded in this analyzer. "
+                             "Reopen the analyzer saved along with the manifest (NLPTextAnalyzer.load) "
+                             "or pass reload=True to parse them again")
+
+        # Take out the previous contributions of changed and removed files
+        group_functions = [self._group_function(grouped.grouping['by']) for grouped in groups]
+        affected = [set() for _ in groups]
+        for path in changed + removed:
+            label = manifest.label(path)
+            if label not in self.corpus:
+                continue
+            self._update_sankey_input(all_results, path, label, -1)
+            for grouped, group_of, touched in zip(groups, group_functions, affected):
+                group = group_of(label, self.metadata.get(label, {}))
+                if group is not None and group in grouped.metadata:
+                    grouped.metadata[group]['members'].remove(label)
+                    touched.add(group)
+            if path in removed:
+                self.remove_document(label)
+
+        for path in removed:
+            manifest.forget(path)
+
+        # Parse only added and changed files
+        to_load = added + changed + missing
+        for path in to_load:
+            self.errors.pop(path, None)
+        self.load_texts(to_load, labels=labels, parser=parser, workers=workers, stop_words=stop_words)
+
+        failed = []
+        for path in to_load:
+            if path in self.errors:
+                failed.append(path)
+                if manifest.label(path) in self.corpus:
+                    self.remove_document(manifest.label(path))
+                manifest.forget(path)
+                continue
+
+            label = self.sources[os.path.abspath(path)]
+            manifest.record(path, label)
+            self._update_sankey_input(all_results, path, label, +1)
+            for grouped, group_of, touched in zip(groups, group_functions, affected):
+                group = group_of(label, self.metadata.get(label, {}))
+                if group is not None:
+                    members = grouped.metadata.get(group, {}).get('members', [])
+                    grouped.metadata.setdefault(group, {'members': members})
+                    if label not in members:
+                        members.append(label)
+                    touched.add(group)
+
+        # Recompute only the groups whose members changed
+        for grouped, touched in zip(groups, affected):
+            for group in touched:
+                members = grouped.metadata[group]['members']
+                if members:
+                    self._build_group(grouped, group, members)
                 else:
-                    results = parser(filepath, 'data/stopwords.txt')
+                    grouped.remove_document(group)
+            if grouped.grouping['text']:
+                grouped.score_documents([group for group in touched if group in grouped.corpus])
 
-                # Combine word counts for this author and text
-                all_results['wordcount'][author_text_key].update(results['wordcount'])
-        return all_results
+        if manifest.path is not None:
+            manifest.save()
+        return {'added': added, 'changed': changed, 'removed': removed, 'reloaded': missing,
+                'failed': failed, 'unchanged': len(unchanged) - len(missing)}
+
+    def _update_sankey_input(self, all_results, filepath, label, sign):
+        """
+        Add (sign=+1) or subtract (sign=-1) a loaded document's word counts to/from its
+        (author, text name) entry of a load_all_text style dictionary
+        """
+        if all_results is None or label not in self.data['wordcount']:
+            return
+        key = self.split_author_text(filepath)
+        counter = all_results['wordcount'].setdefault(key, Counter())
+        if sign > 0:
+            counter.update(self.data['wordcount'][label])
+        else:
+            counter.subtract(self.data['wordcount'][label])
+            for word in [word for word, count in counter.items() if count <= 0]:
+                del counter[word]
+            if not counter:
+                del all_results['wordcount'][key]
 
+    def top_words(self, k, labels=None):
+        """
+        The k most common words over all loaded documents, or only the given labels
+        Returns:
+            list of (word, count) tuples, most common first
+        """
+        return self.corpus.top_words(k, labels)
+
+    def term_documents(self, word, k=None):
+        """
+        Documents containing a word, looked up in the inverted index
+        Args:
+            word: word to look up
+            k: if given, only the k documents using it the most
+        Returns:
+            list of (label, count) tuples, in load order or most occurrences first with k
+        """
+        if k is None:
+            return self.index.postings(word)
+        return self.index.top_documents(word, k)
+
+    def term_frequencies(self, word, by='author'):
+        """
+        Occurrences of a word per group of documents, in time proportional to the number
+        of documents containing it
+        Args:
+            word: word to look up
+            by: 'author', 'date', 'year', 'month' or a function (label, metadata) --> group name
+        Returns:
+            Counter of group name --> occurrences
+        """
+        group_of = self._group_function(by)
+        frequencies = Counter()
+        for label, count in self.index.postings(word):
+            group = group_of(label, self.metadata.get(label, {}))
+            if group is not None:
+                frequencies[group] += count
+        return frequencies
+
+    def term_flows(self, words, k=None):
+        """
+        Author --> text --> word flows of some words, read from the inverted index, as the
+        input of plot_sankey. Only the documents containing the words are visited
+        Args:
+            words: words to follow
+            k: if given, keep only the k documents using each word the most
+        Returns:
+            DataFrame with columns named 'Author', 'TextDate', 'Word', and 'Count'.
+        """
+        import pandas as pd
+
+        with INSTRUMENT.stage('index.flows'):
+            flows = []
+            for word in words:
+                for label, count in self.term_documents(word, k):
+                    author, text_date = self._author_text(label)
+                    flows.append((author, text_date, word, count))
+            df = pd.DataFrame(flows, columns=['Author', 'TextDate', 'Word', 'Count'])
+        return df
+
+    def _author_text(self, label):
+        """
+        Author and text name of a loaded document, as split_author_text gives for files
+        """
+        metadata = self.metadata.get(label, {})
+        if 'path' in metadata:
+            return self.split_author_text(metadata['path'])
+        date = metadata.get('date')
+        return metadata.get('author'), date.isoformat() if date is not None else str(label)
+
+    def save(self, path):
+        """
+        Save the analysis to a directory: the corpus as NumPy arrays (see NLP_corpus.Corpus.save)
+        and the documents' metadata in analyzer.json. Values JSON can't hold, such as a custom
+        group key function, are saved as None
+        Args:
+            path: directory to write, created if needed
+        """
+        self.corpus.save(path)
+
+        # Metadata is stored column-wise, one block per set of keys (documents, groups, ...)
+        blocks = dict()
+        for label, metadata in self.metadata.items():
+            block = blocks.get(tuple(metadata))
+            if block is None:
+                block = blocks[tuple(metadata)] = {'keys': list(metadata), 'labels': [],
+                                                   'columns': [[] for _ in metadata]}
+            block['labels'].append(label)
+            for column, value in zip(block['columns'], metadata.values()):
+                column.append(value)
+
+        # Labels aren't necessarily strings, so label-keyed dictionaries are stored as lists
+        state = {'sentiment': getattr(self.sentiment, 'name', None),
+                 'grouping': self.grouping,
+                 'paths': self.paths,
+                 'sources': [list(self.sources), list(self.sources.values())],
+                 'metadata': list(blocks.values()),
+                 'extras': {key: [list(values), list(values.values())]
+                            for key, values in self.data.extras.items()}}
+        tmp_path = os.path.join(path, 'analyzer.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, default=_json_default)
+        os.replace(tmp_path, os.path.join(path, 'analyzer.json'))
+
+    @classmethod
+    def load(cls, path, mmap=True, **kwargs):
+        """
+        Reopen an analysis written by save without parsing anything. The corpus arrays are
+        memory-mapped, so only the pages a query touches are read
+        Args:
+            path: directory written by save
+            mmap: memory-map the arrays (copy-on-write) rather than reading them into memory
+            kwargs: NLPTextAnalyzer options, e.g. cache. The sentiment backend defaults to the saved one.
+                    An analyzer made by aggregate() is reopened with vocab set to the vocabulary
+                    of its reopened source analyzer, so that refresh can keep it up to date
+        Returns:
+            NLPTextAnalyzer
+        """
+        with open(os.path.join(path, 'analyzer.json'), 'r') as f:
+            state = json.load(f)
+        kwargs.setdefault('sentiment', state['sentiment'])
+
+        analyzer = cls(**kwargs)
+        analyzer.corpus = Corpus.load(path, mmap=mmap, vocab=kwargs.get('vocab'))
+        analyzer.data = CorpusData(analyzer.corpus)
+        analyzer.index = InvertedIndex(analyzer.corpus)
+        analyzer.grouping = state['grouping']
+        analyzer.paths = state['paths']
+        sources, labels = state['sources']
+        analyzer.sources = dict(zip(sources, _json_labels(labels)))
+        for block in state['metadata']:
+            keys, columns = block['keys'], block['columns']
+            for key, column in zip(keys, columns):
+                if key == 'date':
+                    column[:] = [datetime.date.fromisoformat(d) if d is not None else None for d in column]
+                elif key == 'members':
+                    column[:] = map(_json_labels, column)
+            for label, values in zip(_json_labels(block['labels']), zip(*columns)):
+                analyzer.metadata[label] = dict(zip(keys, values))
+        for key, (labels, values) in state['extras'].items():
+            analyzer.data.extras[key] = dict(zip(_json_labels(labels), values))
+        return analyzer
+
+    def _register_source(self, filepath, label):
+        """
+        Remember which label a file was loaded under, along with its author and date
+        """
+        author, text_name = self.split_author_text(filepath)
+        self.sources[os.path.abspath(filepath)] = label
+        self.metadata[label] = {'path': os.path.abspath(filepath), 'author': author, 'date': parse_date(text_name)}
+
+    @staticmethod
+    def _loaded_wordcount(filepath, analyzers):
+        """
+        Find the word counts of a file already loaded by one of the given analyzers
+        Returns:
+            Counter, or None if none of the analyzers loaded the file
+        """
+        path = os.path.abspath(filepath)
+        for analyzer in analyzers:
+            label = analyzer.sources.get(path)
+            if label is not None and label in analyzer.data['wordcount']:
+                return analyzer.data['wordcount'][label]
+        return None
 
     @staticmethod
-    def flatten_wordcount_to_dataframe(all_results):
+    def split_author_text(filepath):
+        """
+        Get the author and text name of a file laid out as .../<author>/<text name>.txt,
+        independently of the OS path separator
+        Returns:
+            tuple of (author, text name)
+        """
+        path = os.path.normpath(filepath)
+        author = os.path.basename(os.path.dirname(path))
+        text_name = os.path.splitext(os.path.basename(path))[0]
+        return author, text_name
+
+    @staticmethod
+    def flatten_wordcount_to_dataframe(all_results, k=None):
         """
         Flattens nested word count data for each author and text, and converts it to a DataFrame.
         Args:
             all_results: a dictionary of word counts for each author and text.
+            k: if given, keep only the k most common words of each author and text. They are
+               picked with a heap before flattening, so only the survivors reach the DataFrame.
         Returns:
             DataFrame with columns named 'Author', 'TextDate', 'Word', and 'Count'.
         """
-        flattened_data = []
-        for (author, text_date), counter in all_results['wordcount'].items():
-            for word, count in counter.items():
-                flattened_data.append((author, text_date, word, count))
+        import pandas as pd
+
+        with INSTRUMENT.stage('dataframe'):
+            flattened_data = []
+            for (author, text_date), counter in all_results['wordcount'].items():
+                items = counter.items() if k is None else counter.most_common(k)
+                for word, count in items:
+                    flattened_data.append((author, text_date, word, count))
 
-        df = pd.DataFrame(flattened_data, columns=['Author', 'TextDate', 'Word', 'Count'])
+            df = pd.DataFrame(flattened_data, columns=['Author', 'TextDate', 'Word', 'Count'])
         return df
 
-    def plot_sankey(self, all_results):
+    def plot_sankey(self, all_results=None, k=3, words=None, **kwargs):
         """
-        Plots a multi-layered Sankey diagram based on word counts for top 5 words of each text file for each author.
+        Plots a multi-layered Sankey diagram based on word counts for top k words of each text file for each author.
         Args:
             all_results: a dictionary of word counts for each author and text.
+            k: number of most common words to keep for each text file, or with words, number
+               of documents to keep for each word (all of them if None)
+            words: if given, plot the flows of these words only, taken from the inverted
+                   index instead of all_results
+            kwargs: options passed on to sankey_lib.make_sankey, e.g. show=False or output='sankey.html'
+        Returns:
+            the Sankey figure
         """
-        # Get DataFrame from the combined function
-        df = self.flatten_wordcount_to_dataframe(all_results)
+        import sankey_lib as sk
 
-        # Group by Author and TextDate, then get the top 5 words for each group
-        top_words_per_group = df.groupby(['Author', 'TextDate']).apply(
-            lambda x: x.sort_values(by='Count', ascending=False).head(3)
-        ).reset_index(drop=True)
+        if words is not None:
+            top_words_per_group = self.term_flows(words, k=k)
+        elif all_results is None:
+            raise ValueError("plot_sankey needs all_results or words")
+        else:
+            # Get DataFrame of the top k words for each author and text
+            top_words_per_group = self.flatten_wordcount_to_dataframe(all_results, k=k)
 
         # Plot the Sankey diagram with the top words per group
-        sk.make_sankey(top_words_per_group, 'Author', 'TextDate', 'Word', vals='Count')
+        return sk.make_sankey(top_words_per_group, 'Author', 'TextDate', 'Word', vals='Count', **kwargs)
 
-    def generate_wordclouds_subplots(self, rows=3, cols=4):
+    def generate_wordclouds_subplots(self, rows=None, cols=None, workers=None, output=None,
+                                     show=True, max_words=200, words=None):
         """
         Generates a subplot of Word Clouds for each individual text file uploaded by the user.
+        Clouds are built from the stored word counts and rendered in a pool of worker processes.
         Args:
-            rows: the amount of rows the user wants for the subplot
-            cols: the amount of columns that user wants for the subplot
+            rows: the amount of rows the user wants for the subplot (grows to fit every file)
+            cols: the amount of columns that user wants for the subplot (at most 4 by default)
+            workers: number of worker processes rendering clouds (defaults to the number of CPUs)
+            output: optional image file path (e.g. 'wordclouds.png') to save the figure to
+            show: display the figure. With show=False no GUI is used at all
+            max_words: maximum number of words in each cloud
+            words: if given, only draw these words, in clouds of the documents containing
+                   them, read from the inverted index
 
         Returns:
-            None
+            the matplotlib figure, or None if no file has word counts
         """
-        # Retrieve the 'allwords' from the results data
-        cloud = wc.WordCloud(colormap='Reds', background_color='black')
-
-        # Calculate subplot layout based on the number of entries in allwords
-        num_entries = len(self.data['allwords'])
-
-        fig, axes = plt.subplots(rows, cols, figsize=(30, 15))  # Increase the figsize here
+        with INSTRUMENT.stage('wordcloud.frequencies'):
+            if words is not None:
+                labels, frequencies = self.index.document_counts(words)
+            else:
+                # Only the max_words most common words of each file can appear in its cloud
+                labels = list(self.data['wordcount'])
+                frequencies = []
+                for label in labels:
+                    ids, counts = self.corpus.row_counts(label)
+                    if len(ids) > max_words:
+                        top = np.argpartition(-counts, max_words - 1)[:max_words]
+                        ids, counts = ids[top], counts[top]
+                    frequencies.append(dict(zip(self.corpus.vocab.lookup(ids), counts.tolist())))
+
+        num_entries = len(labels)
+        if num_entries == 0:
+            return None
+
+        # Calculate subplot layout based on the number of entries
+        cols = cols or min(4, num_entries)
+        rows = max(rows or 1, math.ceil(num_entries / cols))
+
+        # Render the clouds, in parallel when there are several
+        tasks = [(freq, max_words) for freq in frequencies]
+        workers = workers or os.cpu_count() or 1
+        with INSTRUMENT.stage('wordcloud.render'):
+            if workers == 1 or num_entries == 1:
+                images = list(map(_render_wordcloud, tasks))
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers, num_entries)) as pool:
+                    images = list(pool.map(_render_wordcloud, tasks))
 
+        figsize = (7.5 * cols, 5 * rows)
+        if show:
+            import matplotlib.pyplot as plt
+            fig, axes = plt.subplots(rows, cols, figsize=figsize, squeeze=False)
+        else:
+            # Headless: a bare Figure doesn't touch any GUI backend (nor import pyplot)
+            from matplotlib.figure import Figure
+            fig = Figure(figsize=figsize)
+            axes = fig.subplots(rows, cols, squeeze=False)
         fig.tight_layout(pad=3.0)  # Adjust spacing between subplots
-        
-        for idx, (author, words) in enumerate(self.data['allwords'].items()):
-            row = idx // cols
-            col = idx % cols
-
-            # Generate word cloud for the given author
-            letter_cloud = cloud.generate(words)
-
-            # Plot on the respective subplot
-            if num_entries > 1:
-                if rows == 1:
-                    axes[col].imshow(letter_cloud)
-                    axes[col].set_title(author, color="red")
-                    axes[col].axis('off')
-                else:
-                    axes[row, col].imshow(letter_cloud)
-                    axes[row, col].set_title(author, color="red")
-                    axes[row, col].axis('off')
-            else:  # For a single entry, don't use subplots
-                plt.imshow(letter_cloud)
-                plt.title(author, color="red")
-                plt.axis('off')
-         
-        # Hide empty subplots (if any)
-        for idx in range(num_entries, rows * cols):
-            if num_entries == 1:  # For single entry, axes is not an array
-                axes.axis('off')
-            else:
-                row = idx // cols
-                col = idx % cols
-                axes[row, col].axis('off')
-                
-        plt.show()
 
-    def get_sentiment_plot(self, isGroupedAuthor=False):
+        for idx, ax in enumerate(axes.flat):
+            # Plot on the respective subplot, leaving empty subplots (if any) blank
+            if idx < num_entries:
+                if images[idx] is not None:
+                    ax.imshow(images[idx])
+                ax.set_title(labels[idx], color="red")
+            ax.axis('off')
+
+        if output:
+            with INSTRUMENT.stage('wordcloud.save'):
+                fig.savefig(output)
+        if show:
+            plt.show()
+        return fig
+
+    def sentiment_table(self, labels=None):
+        """
+        Sentiment scores as columns, read straight from the corpus arrays, with each document's
+        author and date taken from its metadata (documents without an author go by their label)
+        Args:
+            labels: documents to include (defaults to every document with a polarity score)
+        Returns:
+            dictionary of 'Label', 'Author', 'Date' (ISO format, '' if unknown), 'Polarity'
+            and 'Subjectivity' arrays
+        """
+        with INSTRUMENT.stage('sentiment_table'):
+            if labels is None:
+                labels = self.corpus.labels('polarity')
+            authors, dates = [], []
+            for label in labels:
+                metadata = self.metadata.get(label, {})
+                date = metadata.get('date')
+                authors.append(metadata.get('author') or str(label))
+                dates.append(date.isoformat() if date is not None else '')
+            label_array = np.empty(len(labels), dtype=object)
+            label_array[:] = labels
+            return {'Label': label_array,
+                    'Author': np.array(authors, dtype=object),
+                    'Date': np.array(dates, dtype=object),
+                    'Polarity': self.corpus.get_column(labels, 'polarity'),
+                    'Subjectivity': self.corpus.get_column(labels, 'subjectivity')}
+
+    def get_sentiment_plot(self, isGroupedAuthor=False, max_points=None, bins=None, webgl=None, seed=0):
         """
         Get polarity vs subjectivity scatter plot as figure object without displaying it
-        Args: boolean to differentiate whether loaded text is not grouped by author (files will
-              have dates) from text that's grouped by author (files will not have dates)
-        """
-        if len(self.data) != 0:
-            rows = []
-            if not isGroupedAuthor:
-                for author_date, values in self.data['polarity'].items():
-
-                    # Index where 18th century year ('18**') starts
-                    year_start = author_date.find(' 18')
-
-                    # Get text author and date from index found above
-                    author = author_date[:year_start+1]
-                    date = author_date[year_start:]
-
-                    # Create one row of df which will be used to plot sentiment scores
-                    row = {'Author': author, 'Date': date, 'Polarity': values,
-                           'Subjectivity': self.data['subjectivity'][author_date]}
-                    rows.append(row)
-
-                # Create a DataFrame from the list of dictionaries
-                df = pd.DataFrame(rows)
-
-                # Create a scatter plot with color by Author
-                fig = px.scatter(df, x='Polarity', y='Subjectivity', color='Author', hover_data=['Date'])
-                fig.update_traces(marker=dict(size=8,
-                                              line=dict(width=1,
-                                                        color='DarkSlateGrey')),
-                                  selector=dict(mode='markers'))
+        Args:
+            isGroupedAuthor: boolean to differentiate whether loaded text is not grouped by author
+                             (points are small and show their date) from text that's grouped by
+                             author (points are large)
+            max_points: if given, plot a uniform random sample of at most this many documents
+            bins: if given, plot a bins x bins density heatmap of the documents instead of points
+            webgl: draw points with WebGL (Scattergl). Defaults to doing so above WEBGL_POINTS points
+            seed: random seed of the max_points sample
+        Returns:
+            plotly figure, empty if no document has sentiment scores
+        """
+        import pandas as pd
+        import plotly.graph_objects as go
+        from plotly.colors import qualitative
+
+        with INSTRUMENT.stage('sentiment_plot'):
+            table = self.sentiment_table()
+            keep = ~(np.isnan(table['Polarity']) | np.isnan(table['Subjectivity']))
+            if not keep.all():
+                table = {column: values[keep] for column, values in table.items()}
+            n = len(table['Label'])
+            if n == 0:
+                # Return empty figure if NLP instance doesn't have any scored texts
+                return go.Figure()
+
+            if bins:
+                counts, x_edges, y_edges = np.histogram2d(table['Polarity'], table['Subjectivity'], bins=bins)
+                fig = go.Figure(go.Heatmap(x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                                           z=counts.T, colorscale='Blues', name='Documents',
+                                           colorbar={'title': 'Documents'},
+                                           hovertemplate='Polarity=%{x:.3f}<br>Subjectivity=%{y:.3f}<br>'
+                                                         'Documents=%{z}<extra></extra>'))
+                fig.update_layout(xaxis_title='Polarity', yaxis_title='Subjectivity')
                 return fig
+
+            if max_points is not None and n > max_points:
+                sample = np.sort(np.random.default_rng(seed).choice(n, max_points, replace=False))
+                table = {column: values[sample] for column, values in table.items()}
+                n = max_points
+
+            # One trace per author, in order of first appearance, colored like px.scatter does
+            codes, authors = pd.factorize(table['Author'])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(authors)))))
+            scatter = go.Scattergl if (webgl if webgl is not None else n > WEBGL_POINTS) else go.Scatter
+            if isGroupedAuthor:
+                marker = dict(size=18, line=dict(width=2, color='DarkSlateGrey'))
+                hover = 'Author=%{fullData.name}<br>Polarity=%{x}<br>Subjectivity=%{y}<extra></extra>'
             else:
-                for author, values in self.data['polarity'].items():
-                    # Create one row of df which will be used to plot sentiment scores
-                    row = {'Author': author, 'Polarity': values,
-                           'Subjectivity': self.data['subjectivity'][author]}
-                    rows.append(row)
-
-                # Create a DataFrame from the list of dictionaries
-                df = pd.DataFrame(rows)
-
-                # Create a scatter plot with color by Author
-                fig = px.scatter(df, x='Polarity', y='Subjectivity', color='Author')
-                fig.update_traces(marker=dict(size=18,
-                                              line=dict(width=2,
-                                                        color='DarkSlateGrey')),
-                                  selector=dict(mode='markers'))
-                return fig
-        else:
-            # Return empty scatter object if NLP instance doesn't have any loaded texts
-            return px.scatter()
+                marker = dict(size=8, line=dict(width=1, color='DarkSlateGrey'))
+                hover = ('Author=%{fullData.name}<br>Polarity=%{x}<br>Subjectivity=%{y}<br>'
+                         'Date=%{customdata}<extra></extra>')
+
+            traces = []
+            for i, author in enumerate(authors):
+                rows = order[bounds[i]:bounds[i + 1]]
+                traces.append(scatter(x=table['Polarity'][rows], y=table['Subjectivity'][rows],
+                                      customdata=table['Date'][rows], name=str(author), legendgroup=str(author),
+                                      mode='markers', hovertemplate=hover,
+                                      marker=dict(marker, color=qualitative.Plotly[i % len(qualitative.Plotly)])))
+            fig = go.Figure(traces)
+            fig.update_layout(legend_title_text='Author', xaxis_title='Polarity', yaxis_title='Subjectivity')
+            return fig
 
     @staticmethod
-    def plot_sentiment(fig1, fig2):
+    def plot_sentiment(*figs, show=True, output=None):
         """
-        Overlay two scatter figures and display combined sentiment plot
-        Aegs: 2 scatter figure objects
+        Overlay scatter figures (e.g. from get_sentiment_plot) into one sentiment plot
+        Args:
+            figs: plotly figure objects
+            show: display the combined figure
+            output: optional file path(s) ('.html' or '.json') to export the figure to
+        Returns:
+            the combined figure
         """
+        import plotly.graph_objects as go
+        from sankey_lib import save_figure
 
-        # Create a new figure to combine the two scatters
-        combined_fig = px.scatter()
-
-        # Add traces from fig1 to the combined_fig
-        for trace in fig1['data']:
-            combined_fig.add_trace(trace)
-
-        # Add traces from fig2 to the combined_fig
-        for trace in fig2['data']:
-            combined_fig.add_trace(trace)
-
+        # Combine the traces of every figure at once
+        combined_fig = go.Figure(data=[trace for fig in figs for trace in fig.data])
         combined_fig.update_layout(
             title='Sentiment Analysis',
             title_x=0.45,
@@ -359,8 +1320,14 @@ class NLPTextAnalyzer:
             yaxis_title='Subjectivity'
         )
 
+        if output:
+            for path in [output] if isinstance(output, str) else output:
+                save_figure(combined_fig, path)
+
         # Show the combined scatter plot
-        combined_fig.show()
+        if show:
+            combined_fig.show()
+        return combined_fig
 
     @staticmethod
     def combine_txf_files_and_save(folder_path):
@@ -382,8 +1349,17 @@ class NLPTextAnalyzer:
         """
         Retrieve all .txt file paths in give directory
         """
-        paths = []
+        return list(NLPTextAnalyzer.iter_text_paths(root_directory))
 
+    @staticmethod
+    def iter_text_paths(root_directory, extensions=('.txt',)):
+        """
+        Yield the file paths of a directory laid out as <root>/<author>/<text name>.txt
+        as they are found
+        Args:
+            root_directory: root directory
+            extensions: file name endings kept
+        """
         # Iterate over subdirectories in the root directory
         for author_dir in os.listdir(root_directory):
             author_path = os.path.join(root_directory, author_dir)
@@ -392,8 +1368,154 @@ class NLPTextAnalyzer:
             if os.path.isdir(author_path):
                 # Iterate over files in the author's directory
                 for filename in os.listdir(author_path):
-                    # Avoid reading invisible files and non-txt files
-                    if not filename.startswith('.') and filename.endswith('.txt'):
-                        file_path = os.path.join(author_path, filename)
-                        paths.append(file_path)
-        return paths
+                    # Avoid reading invisible files and files of other types
+                    if not filename.startswith('.') and filename.endswith(tuple(extensions)):
+                        yield os.path.join(author_path, filename)
+
+def parse_date(text_name):
+    """
+    Parse a letter file name such as '1864-2-10' into a date
+    Returns:
+        datetime.date, or None if the name isn't a year-month-day date
+    """
+    try:
+        return datetime.date(*(int(part) for part in text_name.split('-')))
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_default(value):
+    """ JSON encoding of values NLPTextAnalyzer.save meets besides JSON types """
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return None
+
+
+def _json_labels(labels):
+    """ Labels read back from JSON, where tuples become lists """
+    return [tuple(label) if type(label) is list else label for label in labels]
+
+
+def _date_group(fmt):
+    """ Group key function formatting a document's date, e.g. by year or month """
+    def group_of(label, metadata):
+        date = metadata.get('date')
+        return date.strftime(fmt) if date is not None else None
+    return group_of
+
+
+# Group keys supported by NLPTextAnalyzer.aggregate: name --> function (label, metadata) --> group
+GROUP_KEYS = {'author': lambda label, metadata: metadata.get('author'),
+              'date': _date_group('%Y-%m-%d'),
+              'year': _date_group('%Y'),
+              'month': _date_group('%Y-%m')}
+
+
+def _render_wordcloud(task):
+    """
+    Process pool entry point used by NLPTextAnalyzer.generate_wordclouds_subplots
+    Args:
+        task: tuple of (word --> count dictionary, maximum number of words)
+    Returns:
+        image array of the word cloud, or None if there are no words
+    """
+    import wordcloud as wc
+
+    frequencies, max_words = task
+    if not frequencies:
+        return None
+    cloud = wc.WordCloud(colormap='Reds', background_color='black', max_words=max_words)
+    return cloud.generate_from_frequencies(frequencies).to_array()
+
+
+def _parse_records(task):
+    """
+    Process pool entry point used by NLPTextAnalyzer.load_jsonl
+    Args:
+        task: tuple of (record texts, stop words, sentiment backend, instrument). instrument is
+              None, or whether to trace memory while recording metrics in this worker process
+              to send them back, as for _parse_task
+    Returns:
+        tuple of (list of (results, None) or (None, exception) tuples, one per text, and
+        an NLP_instrument snapshot or None)
+    """
+    texts, stop_words, sentiment, instrument = task
+    if instrument is not None:
+        # Hooks only run in the parent process, when the metrics are merged
+        INSTRUMENT.hooks = []
+        INSTRUMENT.reset()
+        INSTRUMENT.enable(trace_memory=instrument)
+    analyzer = NLPTextAnalyzer(sentiment=sentiment)
+    stopwords = analyzer.load_stop_words(stop_words)
+    outcomes = []
+    for text in texts:
+        try:
+            outcomes.append((analyzer._record_results(text, stopwords), None))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes, INSTRUMENT.snapshot() if instrument is not None else None
+
+
+def _parse_batch(task):
+    """
+    Process pool entry point used by NLPTextAnalyzer.load_pipeline
+    Args:
+        task: tuple of (list of (file path, text or None, file size), parser, stop words, sentiment
+              backend, instrument), as for _parse_task. Texts read ahead are tokenized like the
+              default parser does, files without a text are parsed by the parser
+    Returns:
+        list of (results, error, metrics) tuples as returned by _parse_task, one per file
+    """
+    items, parser, stop_words, sentiment, instrument = task
+    outcomes = []
+    for filepath, text, size in items:
+        if text is None:
+            outcomes.append(_parse_task((filepath, parser, stop_words, sentiment, instrument)))
+            continue
+        if instrument is not None:
+            INSTRUMENT.hooks = []
+            INSTRUMENT.reset()
+            INSTRUMENT.enable(trace_memory=instrument)
+        try:
+            analyzer = NLPTextAnalyzer(sentiment=sentiment)
+            stopwords = analyzer.load_stop_words(stop_words)
+            if INSTRUMENT.enabled:
+                # Same stages and counts as the default parser reading the file itself
+                word_list = tokenize_text_instrumented(text, stopwords, INSTRUMENT, filepath, size)
+                results = analyzer._word_results(word_list)
+            else:
+                results = analyzer._record_results(text, stopwords)
+            outcome = results, None
+        except Exception as e:
+            outcome = None, e
+        outcomes.append(outcome + (INSTRUMENT.snapshot() if instrument is not None else None,))
+    return outcomes
+
+
+def _parse_task(task):
+    """
+    Process pool entry point used by NLPTextAnalyzer.load_texts
+    Args:
+        task: tuple of (file path, parser, stop words, sentiment backend, instrument). The parser
+              is either None for the default parser, the name of an NLPTextAnalyzer parser
+              method, or a picklable function. instrument is None, or whether to trace memory
+              while recording metrics in this worker process to send them back
+    Returns:
+        tuple of (results, None, metrics) on success or (None, exception, metrics) on failure,
+        metrics being an NLP_instrument snapshot or None
+    """
+    filepath, parser, stop_words, sentiment, instrument = task
+    if instrument is not None:
+        # Hooks only run in the parent process, when the metrics are merged
+        INSTRUMENT.hooks = []
+        INSTRUMENT.reset()
+        INSTRUMENT.enable(trace_memory=instrument)
+    try:
+        if parser is None:
+            parser = NLPTextAnalyzer(sentiment=sentiment)._default_parser
+        elif isinstance(parser, str):
+            parser = getattr(NLPTextAnalyzer(sentiment=sentiment), parser)
+        outcome = parser(filepath, stop_words), None
+    except Exception as e:
+        outcome = None, e
+    return outcome + (INSTRUMENT.snapshot() if instrument is not None else None,)
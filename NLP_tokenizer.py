@@ -0,0 +1,221 @@
+"""
+Group members: Matthew Xue, Josue Ramirez Antonio, Ruhan Xia
+filename: NLP_tokenizer.py
+description: Single-pass tokenizer engine used by the default text parser. Splits text on
+             punctuation, lowercases it, strips digits and filters stopwords in linear time.
+             Very large files can be tokenized chunk by chunk from a memory map instead.
+"""
+
+from collections import Counter
+import codecs
+import io
+import locale
+import mmap
+import os
+
+# Characters the default parser treats as word separators
+PUNCTUATION = ' ()"?[].&\\,!'
+
+# Translation table replacing every separator with a comma
+_PUNC_TABLE = str.maketrans({ch: ',' for ch in PUNCTUATION})
+
+
+class _DigitTable(dict):
+    """ Translation table deleting every character for which str.isdigit() is True.
+        Entries are computed on first use so the table stays small. """
+    def __missing__(self, codepoint):
+        value = None if chr(codepoint).isdigit() else codepoint
+        self[codepoint] = value
+        return value
+
+
+_DIGIT_TABLE = _DigitTable()
+
+
+def normalize_line(line):
+    """
+    Strip a single line, replace punctuation with commas and lowercase it
+    Args:
+        line (str): raw line of text
+    Returns:
+        normalized line (str)
+    """
+    return line.strip().translate(_PUNC_TABLE).lower()
+
+
+def remove_digits(text):
+    """
+    Delete every digit (any character for which str.isdigit() is True) from text
+    """
+    return text.translate(_DIGIT_TABLE)
+
+
+def split_words(text, stopwords=frozenset()):
+    """
+    Remove digits from normalized text, split it into words and drop empty words and stopwords
+    Args:
+        text (str): text already passed through normalize_line
+        stopwords (set): words to drop
+    Returns:
+        list of words in text order
+    """
+    return [w for w in text.translate(_DIGIT_TABLE).split(',') if w and w not in stopwords]
+
+
+def tokenize_lines(lines, stopwords=frozenset()):
+    """
+    Tokenize an iterable of lines. As in the original parser, lines are stripped and joined
+    without a separator, so a word at the end of one line runs into the start of the next.
+    Args:
+        lines (iterable): lines of text, e.g. an open file
+        stopwords (set): words to drop
+    Returns:
+        list of words in text order
+    """
+    return split_words(''.join(map(normalize_line, lines)), stopwords)
+
+
+def tokenize_file(filepath, stopwords=frozenset()):
+    """
+    Read and tokenize a text file
+    Args:
+        filepath (str): path of the text file
+        stopwords (set): words to drop
+    Returns:
+        list of words in text order
+    """
+    with open(filepath, 'r') as f:
+        return tokenize_lines(f, stopwords)
+
+
+def tokenize_file_instrumented(filepath, stopwords, instrument):
+    """
+    Same as tokenize_file, run as separate read, punctuation, split and stopword stages so that
+    each can be timed, with the file's byte, token and removed stopword counts recorded
+    Args:
+        filepath (str): path of the text file
+        stopwords (set): words to drop
+        instrument: NLP_instrument.Instrumentation recording the metrics
+    Returns:
+        list of words in text order
+    """
+    with instrument.stage('read'):
+        with open(filepath, 'r') as f:
+            size = os.fstat(f.fileno()).st_size
+            text = f.read()
+    return tokenize_text_instrumented(text, stopwords, instrument, filepath, size)
+
+
+def tokenize_text_instrumented(text, stopwords, instrument, filepath, size):
+    """
+    The stages of tokenize_file_instrumented after the read, for the text of a file already
+    read in text mode (e.g. by a reader thread)
+    Args:
+        text (str): content of the file
+        stopwords (set): words to drop
+        instrument: NLP_instrument.Instrumentation recording the metrics
+        filepath (str): path of the file, under which the counts are recorded
+        size (int): size of the file in bytes
+    Returns:
+        list of words in text order
+    """
+    with instrument.stage('punctuation'):
+        # Text mode reads turn every line ending into '\n', as iterating over the file does
+        normalized = ''.join(map(normalize_line, text.split('\n')))
+    with instrument.stage('split'):
+        words = split_words(normalized)
+    with instrument.stage('stopwords'):
+        kept = [w for w in words if w not in stopwords]
+    instrument.record_file(filepath, bytes=size, tokens=len(kept),
+                           stopwords=len(words) - len(kept))
+    return kept
+
+
+# Chunk of a memory-mapped file decoded and tokenized at a time
+CHUNK_SIZE = 1 << 20
+
+
+def iter_file_words(filepath, stopwords=frozenset(), chunk_size=CHUNK_SIZE, encoding=None):
+    """
+    Tokenize a text file chunk by chunk over a memory map, with the same result as
+    tokenize_file but holding only about one chunk of text at a time (plus any line or
+    word longer than a chunk).
+    Bytes are decoded incrementally with universal newlines, like a file opened in text mode.
+    Each line is stripped, and since lines are joined without a separator, a word can run from
+    one line into the next. Pending text is only normalized up to its last separator that is
+    followed by something other than whitespace: trailing whitespace may still be stripped, and
+    a separator resets lowercasing context (final sigma), so pieces lowercase like whole lines.
+    Args:
+        filepath (str): path of the text file
+        stopwords (set): words to drop
+        chunk_size (int): number of bytes decoded at a time
+        encoding (str): file encoding, the locale's preferred encoding (as for open) by default
+    Returns:
+        generator of lists of words, in text order
+    """
+    decoder = codecs.getincrementaldecoder(encoding or locale.getpreferredencoding(False))()
+    decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+
+    # Raw text of the current line not normalized yet, whether only whitespace was seen on
+    # it so far (still to be stripped on the left), and the normalized start of a word
+    # that may continue in the next piece
+    line = ''
+    at_start = True
+    carry = ''
+
+    def normalize(piece):
+        nonlocal carry
+        words = (carry + piece.translate(_PUNC_TABLE).lower().translate(_DIGIT_TABLE)).split(',')
+        carry = words.pop()
+        return [w for w in words if w and w not in stopwords]
+
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        try:
+            view = memoryview(mm) if mm is not None else memoryview(b'')
+            with view:
+                for start in range(0, max(size, 1), chunk_size):
+                    text = decoder.decode(view[start:start + chunk_size], final=start + chunk_size >= size)
+                    parts = text.split('\n')
+                    words = []
+                    for i, part in enumerate(parts):
+                        if at_start:
+                            part = part.lstrip()
+                            at_start = not part
+                        line += part
+                        if i < len(parts) - 1:
+                            words += normalize(line.rstrip())
+                            line = ''
+                            at_start = True
+
+                    # Normalize the unfinished line up to its last separator before non-whitespace
+                    cut = max(map(line.rstrip().rfind, PUNCTUATION))
+                    if cut >= 0:
+                        words += normalize(line[:cut + 1])
+                        line = line[cut + 1:]
+                    if words:
+                        yield words
+        finally:
+            if mm is not None:
+                mm.close()
+
+    words = normalize(line.rstrip())
+    if carry and carry not in stopwords:
+        words.append(carry)
+    if words:
+        yield words
+
+
+def count_file_words(filepath, stopwords=frozenset(), chunk_size=CHUNK_SIZE, encoding=None):
+    """
+    Count the words of a text file in constant memory (see iter_file_words)
+    Returns:
+        tuple of (Counter of words, number of words)
+    """
+    counts = Counter()
+    numwords = 0
+    for words in iter_file_words(filepath, stopwords, chunk_size, encoding):
+        counts.update(words)
+        numwords += len(words)
+    return counts, numwords
@@ -0,0 +1,3 @@
+"""
+Benchmark suite of the NLP text analyzer. Run from the repository root: python -m benchmarks.run
+"""
@@ -0,0 +1,43 @@
+"""
+filename: bench_sankey.py
+description: Benchmark of the Sankey data preparation (stacking, node coding and link building)
+             on large author -> date -> word frames.
+             Run from the repository root: python benchmarks/bench_sankey.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sankey_lib as sk
+
+
+def make_frame(rows, authors=50, dates=2000, words=20000, seed=0):
+    """ Random Author/TextDate/Word/Count frame with the given number of rows """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Author': np.array([f'author {i}' for i in range(authors)])[rng.integers(0, authors, rows)],
+        'TextDate': np.array([f'18{60 + i % 6}-{i % 12 + 1}-{i % 28 + 1} #{i}' for i in range(dates)])[
+            rng.integers(0, dates, rows)],
+        'Word': np.array([f'word{i}' for i in range(words)])[rng.zipf(1.3, rows) % words],
+        'Count': rng.integers(1, 20, rows),
+    })
+
+
+def main(tiers=(100_000, 1_000_000, 3_000_000)):
+    print(f"{'rows':>10} {'links':>10} {'seconds':>10}")
+    for rows in tiers:
+        df = make_frame(rows)
+        start = time.perf_counter()
+        link, labels = sk.prepare_sankey(df, 'Author', 'TextDate', 'Word', vals='Count')
+        elapsed = time.perf_counter() - start
+        print(f"{rows:>10} {len(link['value']):>10} {elapsed:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+filename: bench_startup.py
+description: Benchmark of the cost of importing the library in a fresh interpreter, as paid by
+             every load_texts worker process: wall time, peak memory, and the heaviest imports
+             reported by `python -X importtime`.
+             Run from the repository root: python benchmarks/bench_startup.py
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each scenario imports in a fresh interpreter
+SCENARIOS = {
+    'interpreter': '',
+    'NLP_text_analyzer_lib': 'import NLP_text_analyzer_lib',
+    'sankey_lib': 'import sankey_lib',
+    # What importing the library cost when every plotting/NLP dependency loaded with it
+    'lib + plotting deps': ('import NLP_text_analyzer_lib, sankey_lib, pandas, plotly.express, '
+                            'matplotlib.pyplot, wordcloud, textblob'),
+}
+
+# Run in the child: time the import and report peak RSS (kilobytes on Linux, bytes on macOS)
+_PROBE = """
+import time, resource
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def run_probe(statement):
+    """ Seconds spent on the import statement and peak RSS in MB of a fresh interpreter """
+    out = subprocess.run([sys.executable, '-c', _PROBE.format(statement=statement)], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout.split()
+    return float(out[0]), int(out[1]) / (1e6 if sys.platform == 'darwin' else 1e3)
+
+
+def import_times(statement, depth=1):
+    """
+    Parse `python -X importtime` output
+    Args:
+        statement: import statement run in a fresh interpreter
+        depth: deepest nesting level kept (0 for the modules imported by the statement itself,
+               1 to add the modules they import, ...)
+    Returns:
+        list of (cumulative microseconds, module name) of imports, slowest first
+    """
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stderr
+    times = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level below the module importing them
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level <= depth:
+            times.append((int(cumulative), name.strip()))
+    return sorted(times, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark library import time.')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per scenario, the best is kept')
+    parser.add_argument('--top', type=int, default=8, help='heaviest imports listed per scenario')
+    parser.add_argument('--depth', type=int, default=1, help='deepest import nesting level listed')
+    parser.add_argument('--output', default=None, help='JSON file the results are written to')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'scenario':<24} {'import (ms)':>12} {'peak RSS (MB)':>14}")
+    for name, statement in SCENARIOS.items():
+        runs = [run_probe(statement) for _ in range(args.repeat)]
+        seconds = min(run[0] for run in runs)
+        rss = min(run[1] for run in runs)
+        heaviest = import_times(statement, args.depth)[:args.top] if statement else []
+        results.append({'scenario': name, 'seconds': seconds, 'peak_rss_mb': rss,
+                        'heaviest_imports_us': dict((module, us) for us, module in heaviest)})
+        print(f"{name:<24} {1000 * seconds:>12.1f} {rss:>14.1f}")
+
+    for result in results:
+        if result['heaviest_imports_us']:
+            print(f"\n{result['scenario']}: heaviest imports (-X importtime, cumulative ms)")
+            for module, us in result['heaviest_imports_us'].items():
+                print(f"    {module:<40} {us / 1000:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+filename: bench_tokenizer.py
+description: Benchmark showing that the default tokenizer scales linearly with file size.
+             Run from the repository root: python benchmarks/bench_tokenizer.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NLP_tokenizer import tokenize_file
+
+
+def main(sample='data/Combined Letters/Hazard Stevens/Hazard_combined_letters.txt',
+         stopfile='data/stopwords.txt', factors=(1, 4, 16, 64, 256)):
+    with open(sample, 'r') as f:
+        text = f.read()
+    with open(stopfile, 'r') as f:
+        stopwords = frozenset(f.read().splitlines())
+
+    print(f"{'size (KB)':>10} {'seconds':>10} {'us/KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in factors:
+            path = os.path.join(tmp, f'sample_{factor}.txt')
+            with open(path, 'w') as f:
+                f.write((text + '\n') * factor)
+            size_kb = os.path.getsize(path) / 1024
+
+            start = time.perf_counter()
+            tokenize_file(path, stopwords)
+            elapsed = time.perf_counter() - start
+            print(f"{size_kb:>10.0f} {elapsed:>10.4f} {elapsed / size_kb * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+filename: corpus_generator.py
+description: Deterministic generator of synthetic Civil War letter corpora laid out like
+             data/Individual Letters (<root>/<author>/<year>-<month>-<day>.txt).
+             Words follow a Zipf distribution over the vocabulary of the bundled letters,
+             mixed with stopwords from data/stopwords.txt at the rate found in real letters.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+
+DEFAULT_SOURCE = 'data/Individual Letters'
+DEFAULT_STOPWORDS = 'data/stopwords.txt'
+
+FIRST_NAMES = ['Hazard', 'James', 'Riley', 'William', 'John', 'George', 'Henry', 'Charles',
+               'Thomas', 'Samuel', 'Edward', 'Joseph', 'Daniel', 'Elisha', 'Amos', 'Silas']
+LAST_NAMES = ['Stevens', 'Sayles', 'Hoskinson', 'Morgan', 'Baker', 'Clark', 'Foster', 'Hayes',
+              'Porter', 'Reed', 'Sherman', 'Tucker', 'Wheeler', 'Young', 'Barton', 'Cole']
+
+
+def source_words(source=DEFAULT_SOURCE, stopfile=DEFAULT_STOPWORDS):
+    """
+    Content words ranked by frequency in the bundled letters, the stopwords, and the
+    share of stopwords among all words of the letters
+    """
+    with open(stopfile, 'r') as f:
+        stopwords = [w for w in f.read().splitlines() if w]
+    stopset = set(stopwords)
+
+    counts = {}
+    total = n_stop = 0
+    for author in sorted(os.listdir(source)):
+        author_dir = os.path.join(source, author)
+        if not os.path.isdir(author_dir):
+            continue
+        for name in sorted(os.listdir(author_dir)):
+            if not name.endswith('.txt'):
+                continue
+            with open(os.path.join(author_dir, name), 'r') as f:
+                for word in re.findall(r"[A-Za-z']+", f.read().lower()):
+                    total += 1
+                    if word in stopset:
+                        n_stop += 1
+                    else:
+                        counts[word] = counts.get(word, 0) + 1
+
+    ranked = sorted(counts, key=lambda w: (-counts[w], w))
+    return ranked, stopwords, n_stop / max(total, 1)
+
+
+class LetterGenerator:
+    def __init__(self, seed=0, source=DEFAULT_SOURCE, stopfile=DEFAULT_STOPWORDS, zipf_s=1.1):
+        self.rng = random.Random(seed)
+        self.words, self.stopwords, self.stop_rate = source_words(source, stopfile)
+        # Cumulative Zipf weights over the ranked content words
+        self.cum_weights = []
+        acc = 0.0
+        for rank in range(len(self.words)):
+            acc += 1 / (rank + 1) ** zipf_s
+            self.cum_weights.append(acc)
+
+    def sentence(self):
+        """ One sentence of 6 to 24 words, capitalized, with the odd comma and number """
+        rng = self.rng
+        n = rng.randint(6, 24)
+        n_stop = sum(rng.random() < self.stop_rate for _ in range(n))
+        words = (rng.choices(self.words, cum_weights=self.cum_weights, k=n - n_stop) +
+                 rng.choices(self.stopwords, k=n_stop))
+        rng.shuffle(words)
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), str(rng.randint(1, 1865)))
+        for i in range(1, len(words) - 1):
+            if rng.random() < 0.08:
+                words[i] += ','
+        words[0] = words[0].capitalize()
+        return ' '.join(words) + rng.choice('...?!')
+
+    def letter(self, size):
+        """ Text of roughly size bytes, with paragraphs on separate lines """
+        parts, length = [], 0
+        while length < size:
+            paragraph = ' '.join(self.sentence() for _ in range(self.rng.randint(2, 6)))
+            parts.append(paragraph)
+            length += len(paragraph) + 1
+        return '\n'.join(parts) + '\n'
+
+    @staticmethod
+    def authors(n):
+        """ n distinct author names """
+        base = [f'{first} {chr(65 + (i + j) % 26)}. {last}'
+                for i, last in enumerate(LAST_NAMES) for j, first in enumerate(FIRST_NAMES)]
+        return [base[i % len(base)] + (f' {i // len(base) + 1}' if i >= len(base) else '')
+                for i in range(n)]
+
+
+def generate_corpus(root, n_files, file_size=4096, n_authors=None, seed=0, fmt='txt',
+                    source=DEFAULT_SOURCE, stopfile=DEFAULT_STOPWORDS):
+    """
+    Write a synthetic corpus. The same arguments always produce the same files.
+    Args:
+        root: output directory, laid out like data/Individual Letters
+        n_files: number of letters
+        file_size: approximate size of each letter in bytes
+        n_authors: number of authors (defaults to about one per 25 letters)
+        seed: random seed
+        fmt: 'txt' for text letters, 'json' for {"text": ...} files read by json_parser, or
+             'jsonl' for a single <root>/letters.jsonl file of {"author", "date", "text"}
+             records read by NLPTextAnalyzer.load_jsonl
+    Returns:
+        list of the written file paths
+    """
+    gen = LetterGenerator(seed=seed, source=source, stopfile=stopfile)
+    n_authors = n_authors or max(1, n_files // 25)
+    authors = gen.authors(n_authors)
+
+    paths = []
+    used = set()
+    jsonl = None
+    if fmt == 'jsonl':
+        os.makedirs(root, exist_ok=True)
+        paths.append(os.path.join(root, 'letters.jsonl'))
+        jsonl = open(paths[0], 'w')
+
+    for i in range(n_files):
+        author = authors[i % n_authors]
+        for _ in range(50):
+            date = f'{gen.rng.randint(1861, 1865)}-{gen.rng.randint(1, 12)}-{gen.rng.randint(1, 28)}'
+            if (author, date) not in used:
+                break
+        else:
+            date = f'{date}-{i}'
+        used.add((author, date))
+
+        if jsonl is not None:
+            jsonl.write(json.dumps({'author': author, 'date': date, 'text': gen.letter(file_size)}) + '\n')
+            continue
+
+        author_dir = os.path.join(root, author)
+        os.makedirs(author_dir, exist_ok=True)
+        path = os.path.join(author_dir, f'{date}.{fmt}')
+        text = gen.letter(file_size)
+        with open(path, 'w') as f:
+            if fmt == 'json':
+                json.dump({'filename': os.path.basename(path), 'authors': [author], 'text': text}, f)
+            else:
+                f.write(text)
+        paths.append(path)
+
+    if jsonl is not None:
+        jsonl.close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Civil War letter corpus.')
+    parser.add_argument('root', help='output directory')
+    parser.add_argument('--files', type=int, default=100, help='number of letters')
+    parser.add_argument('--size', type=int, default=4096, help='approximate bytes per letter')
+    parser.add_argument('--authors', type=int, default=None, help='number of authors')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['txt', 'json', 'jsonl'], default='txt')
+    args = parser.parse_args()
+    paths = generate_corpus(args.root, args.files, args.size, args.authors, args.seed, args.format)
+    print(f'Wrote {args.files} letters to {args.root}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+filename: run.py
+description: Benchmark suite of the analyzer's hot paths on synthetic letter corpora of several
+             size tiers. Results (time, throughput and peak memory of each benchmark and tier)
+             are written as JSON so that runs can be compared and regressions flagged.
+             Run from the repository root:
+                 python -m benchmarks.run --tiers small medium --output results.json
+                 python -m benchmarks.run --compare results.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus_generator import generate_corpus
+
+# Tier name --> (number of letters, approximate bytes per letter)
+TIERS = {
+    'small': (50, 4 * 1024),
+    'medium': (500, 8 * 1024),
+    'large': (2000, 16 * 1024),
+}
+
+# Word clouds are rendered for at most this many letters of a tier
+WORDCLOUD_LIMIT = 8
+
+STOPWORDS_FILE = 'data/stopwords.txt'
+
+
+class Workload:
+    """ Generated corpus of one tier, as text letters, json letters and a JSON Lines file """
+    def __init__(self, root, tier, seed=0):
+        n_files, file_size = TIERS[tier]
+        self.tier = tier
+        self.paths = generate_corpus(os.path.join(root, tier, 'txt'), n_files, file_size, seed=seed)
+        self.json_paths = generate_corpus(os.path.join(root, tier, 'json'), n_files, file_size,
+                                          seed=seed, fmt='json')
+        self.jsonl_path = generate_corpus(os.path.join(root, tier, 'jsonl'), n_files, file_size,
+                                          seed=seed, fmt='jsonl')[0]
+        self.files = len(self.paths)
+        self.bytes = sum(os.path.getsize(path) for path in self.paths)
+
+    def loaded(self, sentiment=None):
+        """ Analyzer with every text letter loaded """
+        import NLP_text_analyzer_lib as NLP
+        analyzer = NLP.NLPTextAnalyzer(sentiment=sentiment)
+        analyzer.load_texts(self.paths, labels=letter_label, workers=1)
+        return analyzer
+
+
+def letter_label(path):
+    """ Unique label of a generated letter: '<author> <date>' """
+    author, date = os.path.normpath(path).split(os.sep)[-2:]
+    return f'{author} {os.path.splitext(date)[0]}'
+
+
+# Each benchmark prepares its input from a Workload (not timed) and returns the function timed
+
+def bench_default_parser(work):
+    import NLP_text_analyzer_lib as NLP
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    stopwords = analyzer.load_stop_words(STOPWORDS_FILE)
+    return lambda: [analyzer._default_parser(path, stopwords) for path in work.paths]
+
+
+def bench_mmap_counts_parser(work):
+    import NLP_text_analyzer_lib as NLP
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    stopwords = analyzer.load_stop_words(STOPWORDS_FILE)
+    return lambda: [analyzer.mmap_counts_parser(path, stopwords) for path in work.paths]
+
+
+def bench_json_parser(work):
+    import NLP_text_analyzer_lib as NLP
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    stopwords = analyzer.load_stop_words(STOPWORDS_FILE)
+    return lambda: [analyzer.json_parser(path, stopwords) for path in work.json_paths]
+
+
+def bench_load_jsonl(work):
+    import NLP_text_analyzer_lib as NLP
+    return lambda: NLP.NLPTextAnalyzer(sentiment=None).load_jsonl(work.jsonl_path)
+
+
+def bench_load_all_text(work):
+    import NLP_text_analyzer_lib as NLP
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    return lambda: analyzer.load_all_text(work.paths)
+
+
+def bench_plot_sankey_prep(work):
+    import NLP_text_analyzer_lib as NLP
+    import sankey_lib as sk
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    all_results = analyzer.load_all_text(work.paths)
+
+    def run():
+        df = analyzer.flatten_wordcount_to_dataframe(all_results, k=3)
+        return sk.prepare_sankey(df, 'Author', 'TextDate', 'Word', vals='Count')
+    return run
+
+
+def bench_make_sankey(work):
+    import NLP_text_analyzer_lib as NLP
+    import sankey_lib as sk
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    df = analyzer.flatten_wordcount_to_dataframe(analyzer.load_all_text(work.paths))
+    return lambda: sk.make_sankey(df, 'Author', 'TextDate', 'Word', vals='Count', min_value=2, show=False)
+
+
+def bench_term_queries(work):
+    from NLP_index import InvertedIndex
+    analyzer = work.loaded()
+    words = [word for word, _ in analyzer.top_words(50)]
+
+    def run():
+        analyzer.index = InvertedIndex(analyzer.corpus)
+        for word in words:
+            analyzer.term_frequencies(word)
+            analyzer.term_documents(word, 10)
+    return run
+
+
+def bench_sentiment_textblob(work):
+    from NLP_sentiment import TextBlobSentiment
+    analyzer = work.loaded()
+    analyzer.sentiment = TextBlobSentiment()
+    labels = list(analyzer.data['wordcount'])
+    return lambda: analyzer.score_documents(labels)
+
+
+def bench_sentiment_lexicon(work):
+    from NLP_sentiment import LexiconSentiment
+    analyzer = work.loaded()
+    analyzer.sentiment = LexiconSentiment()
+    labels = list(analyzer.data['wordcount'])
+    return lambda: analyzer.score_documents(labels)
+
+
+def bench_wordclouds(work):
+    import NLP_text_analyzer_lib as NLP
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    analyzer.load_texts(work.paths[:WORDCLOUD_LIMIT], labels=letter_label, workers=1)
+    return lambda: analyzer.generate_wordclouds_subplots(workers=1, show=False)
+
+
+BENCHMARKS = {
+    'default_parser': bench_default_parser,
+    'mmap_counts_parser': bench_mmap_counts_parser,
+    'json_parser': bench_json_parser,
+    'load_jsonl': bench_load_jsonl,
+    'load_all_text': bench_load_all_text,
+    'plot_sankey_prep': bench_plot_sankey_prep,
+    'make_sankey': bench_make_sankey,
+    'term_queries': bench_term_queries,
+    'sentiment_textblob': bench_sentiment_textblob,
+    'sentiment_lexicon': bench_sentiment_lexicon,
+    'wordclouds': bench_wordclouds,
+}
+
+
+def measure(name, work, repeat=3):
+    """
+    Time a benchmark (best of repeat runs), then measure its peak traced memory in a separate run
+    Returns:
+        result dictionary
+    """
+    run = BENCHMARKS[name](work)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+
+    # Fresh inputs so that caches warmed by the timed runs don't hide allocations
+    run = BENCHMARKS[name](work)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    files = min(work.files, WORDCLOUD_LIMIT) if name == 'wordclouds' else work.files
+    size = work.bytes * files // work.files
+    return {'benchmark': name, 'tier': work.tier, 'files': files, 'bytes': size,
+            'seconds': seconds, 'files_per_s': files / seconds, 'mb_per_s': size / seconds / 1e6,
+            'peak_mb': peak / 1e6}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare results with a previous run
+    Args:
+        results, baseline: result lists as written in the JSON output
+        threshold: relative slowdown or memory growth flagged as a regression
+    Returns:
+        list of (benchmark, tier, metric, old value, new value) regressions
+    """
+    old = {(r['benchmark'], r['tier']): r for r in baseline}
+    regressions = []
+    print(f"\n{'benchmark':<20} {'tier':<8} {'time':>8} {'memory':>8}")
+    for result in results:
+        before = old.get((result['benchmark'], result['tier']))
+        if before is None:
+            continue
+        ratios = []
+        for metric in ('seconds', 'peak_mb'):
+            ratio = result[metric] / before[metric] if before[metric] else 1.0
+            ratios.append(ratio)
+            if ratio > 1 + threshold:
+                regressions.append((result['benchmark'], result['tier'], metric,
+                                    before[metric], result[metric]))
+        print(f"{result['benchmark']:<20} {result['tier']:<8} {ratios[0]:>7.2f}x {ratios[1]:>7.2f}x")
+    for name, tier, metric, before, after in regressions:
+        print(f"REGRESSION {name} [{tier}] {metric}: {before:.4g} -> {after:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the NLP text analyzer.')
+    parser.add_argument('--tiers', nargs='+', choices=list(TIERS), default=['small', 'medium'])
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='benchmarks to run (all by default)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best is kept')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated corpora')
+    parser.add_argument('--workdir', default=None, help='where corpora are generated (temporary by default)')
+    parser.add_argument('--output', default=None, help='JSON file the results are written to')
+    parser.add_argument('--compare', default=None, help='JSON results of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown or memory growth reported as a regression')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'benchmark':<20} {'tier':<8} {'files':>6} {'seconds':>9} {'MB/s':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.workdir or tmp
+        for tier in args.tiers:
+            work = Workload(root, tier, seed=args.seed)
+            for name in args.only:
+                result = measure(name, work, repeat=args.repeat)
+                results.append(result)
+                print(f"{name:<20} {tier:<8} {result['files']:>6} {result['seconds']:>9.4f} "
+                      f"{result['mb_per_s']:>8.2f} {result['peak_mb']:>8.1f}")
+
+    report = {
+        'meta': {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'commit': git_commit(), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                 'repeat': args.repeat, 'seed': args.seed,
+                 'tiers': {tier: TIERS[tier] for tier in args.tiers}},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 """
-filename: sankey.py
+filename: sankey_lib.py
 description: reusable library for sankey diagram
 """
 
+import os
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
+from NLP_instrument import INSTRUMENT
+
+# Rows per chunk when Sankey input is read from a file
+CHUNKSIZE = 100_000
 
 def map_columns_to_numbers(df, src, targ):
     """
@@ -14,95 +19,284 @@ def map_columns_to_numbers(df, src, targ):
         src (str): Source column name.
         targ (str): Target column name.
     Returns:
-        df (DataFrame): Mapped DataFrame with numeric columns.
+        df (DataFrame): Mapped DataFrame with integer code columns.
         labels (list): List of distinct labels for nodes.
     """
 
-    # Get distinct labels
-    labels = sorted(list(set(list(df[src]) + list(df[targ]))))
+    # Get distinct labels (only the unique values get sorted)
+    labels = sorted(pd.unique(pd.concat([df[src], df[targ]], ignore_index=True)))
 
-    # Get integer codes
-    codes = list(range(len(labels)))
+    # Substitute names for their integer codes with a vectorized hash lookup
+    label_index = pd.Index(labels)
+    df = df.assign(**{src: label_index.get_indexer(df[src]),
+                      targ: label_index.get_indexer(df[targ])})
 
-    # Create label to code mapping
-    lc_map = dict(zip(labels, codes))
+    return df, labels
 
-    # Substitute names for codes in dataframe
-    df = df.replace({src: lc_map, targ: lc_map})
+def iter_chunks(source, columns=None, chunksize=CHUNKSIZE):
+    """
+    Read Sankey input one DataFrame chunk at a time.
+    Args:
+        source: DataFrame, iterable of DataFrame chunks, or path of a '.csv' or '.parquet' file.
+        columns (list): columns read from files (all by default).
+        chunksize (int): rows per chunk read from files.
+    Returns:
+        generator of DataFrames.
+    """
+    if isinstance(source, pd.DataFrame):
+        yield source
+    elif isinstance(source, (str, os.PathLike)):
+        ext = os.path.splitext(source)[1].lower()
+        if ext == '.csv':
+            yield from pd.read_csv(source, usecols=columns, chunksize=chunksize)
+        elif ext == '.parquet':
+            # pyarrow is only needed for Parquet input
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            raise ValueError(f"Can't read Sankey input from {source}, use a '.csv' or '.parquet' file.")
+    else:
+        yield from source
 
-    return df, labels
+def stack_pairs(df, *cols, vals=None, chunksize=CHUNKSIZE):
+    """
+    Aggregate every consecutive pair of columns into links for Sankey Diagram.
+    Args:
+        df: Input DataFrame, or an iterable of DataFrame chunks or a '.csv'/'.parquet' path
+            aggregated chunk by chunk (see stack_chunks).
+        cols (tuple): Columns used as source or target.
+        vals (str): Column name for values (counts).
+        chunksize (int): rows per chunk read from files.
+    Returns:
+        frames (list): one DataFrame with src, targ and num columns per column pair.
+    """
+    if not isinstance(df, pd.DataFrame):
+        return stack_chunks(df, *cols, vals=vals, chunksize=chunksize)
+
+    frames = []
+    for src, targ in zip(cols, cols[1:]):
+        if vals is None:
+            # Aggregate the data, counting the number of items
+            grouped = df.groupby([src, targ], observed=True).size()
+        else:
+            grouped = df.groupby([src, targ], observed=True)[vals].sum()
+        frames.append(pd.DataFrame({'src': grouped.index.get_level_values(0),
+                                    'targ': grouped.index.get_level_values(1),
+                                    'num': grouped.to_numpy()}))
+    return frames
+
+def stack_chunks(chunks, *cols, vals=None, chunksize=CHUNKSIZE):
+    """
+    Aggregate every consecutive pair of columns into links, one chunk of rows at a time.
+    Node values are interned as integer codes, each chunk is reduced to its links right
+    away, and partial link tables are merged whenever they outgrow the merged table, so
+    memory is bounded by the number of distinct links (plus one chunk) rather than by the
+    number of input rows.
+    Args:
+        chunks: iterable of DataFrames, or a '.csv'/'.parquet' path (see iter_chunks).
+        cols (tuple): Columns used as source or target.
+        vals (str): Column name for values, summed; rows are counted if None.
+        chunksize (int): rows per chunk read from files.
+    Returns:
+        frames (list): one DataFrame with src, targ and num columns per column pair.
+    """
+    columns = list(dict.fromkeys(cols + ((vals,) if vals is not None else ())))
+    # Per column: value --> code and code --> value
+    codes = {col: dict() for col in cols}
+    values = {col: [] for col in cols}
+    # Per column pair: link sums indexed by src code << 32 | targ code, merged table first
+    parts = [[] for _ in zip(cols, cols[1:])]
+    merged_size = [0] * len(parts)
+
+    for chunk in iter_chunks(chunks, columns, chunksize):
+        chunk_codes = dict()
+        for col in set(cols):
+            inverse, uniques = pd.factorize(chunk[col])
+            uniques = uniques.tolist()
+            table = codes[col]
+            for value in uniques:
+                if value not in table:
+                    table[value] = len(values[col])
+                    values[col].append(value)
+            # Missing values (code -1) map to -1 and are dropped like groupby does
+            mapping = np.fromiter([table[value] for value in uniques] + [-1], dtype=np.int64, count=len(uniques) + 1)
+            chunk_codes[col] = mapping[inverse]
+        weights = chunk[vals].to_numpy() if vals is not None else np.ones(len(chunk), dtype=np.int64)
+
+        for j, (src, targ) in enumerate(zip(cols, cols[1:])):
+            present = (chunk_codes[src] >= 0) & (chunk_codes[targ] >= 0)
+            keys = (chunk_codes[src][present] << 32) | chunk_codes[targ][present]
+            parts[j].append(pd.Series(weights[present]).groupby(keys).sum())
+            if sum(map(len, parts[j])) > 2 * max(merged_size[j], chunksize):
+                parts[j] = [pd.concat(parts[j]).groupby(level=0).sum()]
+                merged_size[j] = len(parts[j][0])
+
+    frames = []
+    for (src, targ), part in zip(zip(cols, cols[1:]), parts):
+        links = pd.concat(part).groupby(level=0).sum() if part else pd.Series([], dtype=np.int64)
+        keys = links.index.to_numpy(dtype=np.int64)
+        src_values = np.empty(len(values[src]), dtype=object)
+        src_values[:] = values[src]
+        targ_values = np.empty(len(values[targ]), dtype=object)
+        targ_values[:] = values[targ]
+        frame = pd.DataFrame({'src': src_values[keys >> 32], 'targ': targ_values[keys & 0xFFFFFFFF],
+                              'num': links.to_numpy()})
+        # Same order as groupby over the whole input
+        frames.append(frame.sort_values(['src', 'targ'], ignore_index=True))
+    return frames
 
 def stack_columns_to_dataframe(df, *cols, vals=None):
     """
     Stack columns to create a concatenated DataFrame for Sankey Diagram.
     Args:
-        df (DataFrame): Input DataFrame.
+        df: Input DataFrame, iterable of DataFrame chunks or '.csv'/'.parquet' path.
         cols (tuple): Columns used as source or target.
         vals (str): Column name for values (counts).
     Returns:
         stacked (DataFrame): Stacked DataFrame with source, target, and count columns.
     """
+    frames = stack_pairs(df, *cols, vals=vals)
+    if not frames:
+        return pd.DataFrame({'src': [], 'targ': [], 'num': []})
 
-    # Create pairs from columns to have one src and one targ at a time
-    pairs = list(zip(cols, cols[1:]))
+    # Concatenate all pairs at once
+    stacked = pd.concat(frames, axis=0, ignore_index=True)
+    return stacked
 
-    # If there's no values column
-    if vals is None:
-        stacked = pd.DataFrame({'src': [], 'targ': []})
-        for src, targ in pairs:
-            # Aggregate the data, counting the number of items
-            grouped = df[[src, targ]].groupby([src, targ]).size().reset_index()
-            grouped.columns = ['src', 'targ', 'num']
-            # Concatenate df with only one pair to the current df
-            stacked = pd.concat([stacked, grouped], axis=0)
+def prune_pairs(frames, cols, min_value=0, top_n=None, other=None):
+    """
+    Prune the links of each column pair before nodes get labelled, so that
+    only nodes and links that will be drawn are kept.
+    Args:
+        frames (list): per column pair DataFrames from stack_pairs.
+        cols (tuple): column names, one more than there are frames.
+        min_value (int): drop links with a smaller value.
+        top_n (int): keep only the top_n nodes of each column, ranked by flow.
+        other (str): if given, nodes cut by top_n are merged into an '<other> <column>'
+                     node instead of being dropped. Node values are then converted to
+                     strings so that they sort along with the merged nodes.
+    Returns:
+        frames (list): pruned DataFrames.
+    """
+    if min_value > 0:
+        frames = [f[f['num'] >= min_value] for f in frames]
+    if not top_n or not frames:
+        return frames
 
-    # If there's a values column
-    else:
-        stacked = pd.DataFrame({'src': [], 'targ': [], 'num': []})
-        for src, targ in pairs:
-            grouped = df[[src, targ, vals]].groupby([src, targ])[vals].sum().reset_index()
-            grouped.columns = ['src', 'targ', 'num']
-            stacked = pd.concat([stacked, grouped], axis=0)
+    # Node flow is the larger of its incoming and outgoing totals
+    keep = []
+    for j in range(len(cols)):
+        totals = []
+        if j > 0:
+            totals.append(frames[j - 1].groupby('targ')['num'].sum())
+        if j < len(frames):
+            totals.append(frames[j].groupby('src')['num'].sum())
+        flow = pd.concat(totals).groupby(level=0).max()
+        keep.append(flow.nlargest(top_n).index)
 
-    return stacked
+    pruned = []
+    for j, f in enumerate(frames):
+        f = f.astype({'src': object, 'targ': object})
+        src_kept = f['src'].isin(keep[j])
+        targ_kept = f['targ'].isin(keep[j + 1])
+        if other is None:
+            f = f[src_kept & targ_kept]
+        else:
+            f = f.assign(src=f['src'].astype(str).where(src_kept, f"{other} {cols[j]}"),
+                         targ=f['targ'].astype(str).where(targ_kept, f"{other} {cols[j + 1]}"))
+            f = f.groupby(['src', 'targ'])['num'].sum().reset_index()
+        pruned.append(f)
+    return pruned
 
-def make_sankey(df, *cols, vals=None, **kwargs):
+def prepare_sankey(df, *cols, vals=None, **kwargs):
     """
-    Create a Sankey diagram linking source values to target values with optional arguments.
+    Build the link and node label data of a Sankey diagram without plotting it.
     Args:
-        df (DataFrame): Input DataFrame.
+        df: Input DataFrame, iterable of DataFrame chunks or '.csv'/'.parquet' path.
         cols (tuple): Source and target columns.
         vals (str): Column name for values.
-        kwargs (dict): Additional customization options.
+        kwargs (dict): 'min_value', 'top_n' and 'other' pruning options (see prune_pairs),
+                       and 'chunksize' (rows per chunk read from files).
+    Returns:
+        link (dict): integer arrays for 'source', 'target' and 'value'.
+        labels (list): node labels, indexed by the link codes.
     """
-    # Run stacking regardless of the number of columns
-    df = stack_columns_to_dataframe(df, *cols, vals=vals)
+    # Aggregate each column pair and prune before assigning node labels
+    with INSTRUMENT.stage('sankey.stack'):
+        frames = stack_pairs(df, *cols, vals=vals, chunksize=kwargs.get('chunksize', CHUNKSIZE))
+    with INSTRUMENT.stage('sankey.prune'):
+        frames = prune_pairs(frames, cols, min_value=kwargs.get('min_value', 0),
+                             top_n=kwargs.get('top_n'), other=kwargs.get('other'))
+    if frames:
+        df = pd.concat(frames, axis=0, ignore_index=True)
+    else:
+        df = pd.DataFrame({'src': [], 'targ': [], 'num': []})
+
     src, targ, vals = 'src', 'targ', 'num'
     # Modify the DataFrame
-    df, labels = map_columns_to_numbers(df, src, targ)
-
-    # Apply the threshold if provided
-    val_min = kwargs.get('min_value', 0)
-    if vals and val_min > 0:
-        df = df[df[vals] >= val_min]
+    with INSTRUMENT.stage('sankey.labels'):
+        df, labels = map_columns_to_numbers(df, src, targ)
 
     # Assign values to links
-    if vals:
-        values = df[vals]
+    link = {'source': df[src].to_numpy(), 'target': df[targ].to_numpy(),
+            'value': df[vals].to_numpy()}
+    return link, labels
+
+def save_figure(fig, path):
+    """
+    Export a figure without a display, as HTML or as plotly JSON depending on the file extension.
+    Args:
+        fig (Figure): plotly figure.
+        path (str): output file ending in '.html' or '.json'.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.html', '.htm'):
+        fig.write_html(path)
+    elif ext == '.json':
+        fig.write_json(path)
     else:
-        values = [1] * len(df)
+        raise ValueError(f"Can't export figure to {path}, use a '.html' or '.json' file.")
+
+def make_sankey(df, *cols, vals=None, **kwargs):
+    """
+    Create a Sankey diagram linking source values to target values with optional arguments.
+    Args:
+        df: Input DataFrame, or an iterable of DataFrame chunks or a '.csv'/'.parquet' path
+            for input too large for memory, aggregated chunk by chunk.
+        cols (tuple): Source and target columns.
+        vals (str): Column name for values.
+        kwargs (dict): Additional customization options: pruning ('min_value', 'top_n', 'other'),
+                       layout ('pad', 'width', 'height'), 'output' file path(s) to export the
+                       diagram to, 'show' (default True) to display it, and 'chunksize'.
+    Returns:
+        fig (Figure): the Sankey diagram.
+    """
+    # plotly is only needed to draw, not to prepare the data
+    import plotly.graph_objects as go
+
+    link, labels = prepare_sankey(df, *cols, vals=vals, **kwargs)
 
     # Create the Sankey object
-    link = {'source': df[src], 'target': df[targ], 'value': values}
-    pad = kwargs.get('pad', 50)
-    node = {'label': labels, 'pad': pad}
-    sk = go.Sankey(link=link, node=node)
-    fig = go.Figure(sk)
+    with INSTRUMENT.stage('sankey.figure'):
+        pad = kwargs.get('pad', 50)
+        node = {'label': labels, 'pad': pad}
+        sk = go.Sankey(link=link, node=node)
+        fig = go.Figure(sk)
+
+        # Customize the layout
+        width = kwargs.get('width', 800)
+        height = kwargs.get('height', 800)
+        fig.update_layout(autosize=False, width=width, height=height)
 
-    # Customize the layout
-    width = kwargs.get('width', 800)
-    height = kwargs.get('height', 800)
-    fig.update_layout(autosize=False, width=width, height=height)
+    # Export the Sankey diagram headlessly
+    output = kwargs.get('output')
+    if output:
+        with INSTRUMENT.stage('sankey.export'):
+            for path in [output] if isinstance(output, str) else output:
+                save_figure(fig, path)
 
     # Show the Sankey diagram
-    fig.show()
+    if kwargs.get('show', True):
+        fig.show()
+    return fig
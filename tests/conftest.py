@@ -0,0 +1,21 @@
+"""
+filename: conftest.py
+description: pytest setup: the library modules are imported from the repository root and
+             tests run from it, since data and stopword paths are relative to it.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def repo_root():
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    yield ROOT
+    os.chdir(cwd)
@@ -0,0 +1,50 @@
+"""
+filename: test_app.py
+description: The batch job's --state mode against analyzing the letters from scratch.
+"""
+
+import os
+import shutil
+
+import NLP_text_analyzer_app as app
+import NLP_text_analyzer_lib as NLP
+from NLP_instrument import INSTRUMENT
+
+
+def run(*argv):
+    try:
+        return app.main(list(argv))
+    finally:
+        INSTRUMENT.disable()
+        INSTRUMENT.reset()
+
+
+def test_state_is_kept_up_to_date(tmp_path):
+    letters = tmp_path / 'letters'
+    shutil.copytree('data/Individual Letters', letters)
+    state = tmp_path / 'state'
+    argv = (str(letters), '--state', str(state), '--output-dir', str(tmp_path / 'output'), '--no-cache',
+            '--workers', '1', '--wordclouds', 'none')
+    assert run(*argv) == 0
+
+    # Change, add and remove a letter
+    changed = letters / 'Hazard Stevens' / '1861-9-15.txt'
+    with open(changed, 'a') as f:
+        f.write('\nrebels rebels cannon\n')
+    shutil.copy(changed, letters / 'Hazard Stevens' / '1865-1-1.txt')
+    os.remove(letters / 'Riley M. Hoskinson' / '1863-9-16.txt')
+    assert run(*argv) == 0
+
+    fresh = NLP.NLPTextAnalyzer()
+    fresh.load_texts(fresh.get_text_paths(str(letters)), labels=app.letter_label, workers=1)
+    fresh_authors = fresh.aggregate('author', text=True)
+    saved = NLP.NLPTextAnalyzer.load(str(state))
+    authors = NLP.NLPTextAnalyzer.load(str(state / 'authors'), vocab=saved.corpus.vocab)
+
+    assert sorted(authors.data['wordcount']) == sorted(fresh_authors.data['wordcount'])
+    for author in fresh_authors.data['wordcount']:
+        assert authors.data['wordcount'][author] == fresh_authors.data['wordcount'][author]
+        assert authors.data['numwords'][author] == fresh_authors.data['numwords'][author]
+        for field in ('polarity', 'subjectivity'):
+            assert abs(authors.data[field][author] - fresh_authors.data[field][author]) < 1e-9
+    assert app.load_sankey_input(str(state / 'sankey.json')) == fresh.load_all_text(reuse=True)
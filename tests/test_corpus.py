@@ -0,0 +1,51 @@
+"""
+filename: test_corpus.py
+description: The corpus-backed data dictionary against the behaviour of the defaultdict(dict)
+             it replaces.
+"""
+
+from collections import Counter
+
+import pytest
+
+import NLP_text_analyzer_lib as NLP
+
+LETTER = 'data/Individual Letters/Hazard Stevens/1861-9-15.txt'
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    analyzer.load_text(LETTER, label='L')
+    return analyzer
+
+
+def test_saving_some_statistics_keeps_the_others(analyzer):
+    before = analyzer.data.corpus.results('L')
+    analyzer._save_results('L', {'polarity': 0.5})
+    assert analyzer.data['polarity']['L'] == 0.5
+    assert {field: analyzer.data[field]['L'] for field in before} == before
+
+    analyzer._save_results('L', {'allwords': 'one two', 'subjectivity': 0.25, 'source': 'x'})
+    assert analyzer.data['allwords']['L'] == 'one two'
+    assert analyzer.data['subjectivity']['L'] == 0.25 and analyzer.data['source'] == {'L': 'x'}
+    assert analyzer.data['wordcount']['L'] == before['wordcount']
+    assert analyzer.data['numwords']['L'] == before['numwords']
+
+
+def test_saving_all_statistics_replaces_the_document(analyzer):
+    results = {'wordcount': Counter(war=2), 'numwords': 2, 'polarity': 0.0, 'subjectivity': 0.0,
+               'allwords': 'war war'}
+    analyzer._save_results('L', results)
+    assert {field: analyzer.data[field]['L'] for field in results} == results
+
+
+def test_word_counts_are_read_only(analyzer):
+    counts = analyzer.data['wordcount']['L']
+    with pytest.raises(TypeError):
+        counts['war'] += 1
+    with pytest.raises(TypeError):
+        counts.update(['war'])
+    copy = counts.copy()
+    copy['war'] += 1
+    assert analyzer.data['wordcount']['L'] == counts
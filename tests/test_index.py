@@ -0,0 +1,65 @@
+"""
+filename: test_index.py
+description: Inverted index postings against a scan of every document's word counts.
+"""
+
+from collections import Counter
+
+import pytest
+
+import NLP_text_analyzer_lib as NLP
+from NLP_text_analyzer_app import letter_label
+
+
+def scan(analyzer, word):
+    return [(label, counts[word]) for label, counts in analyzer.data['wordcount'].items() if word in counts]
+
+
+def assert_index_matches_scan(analyzer, words):
+    for word in words:
+        expected = scan(analyzer, word)
+        assert analyzer.term_documents(word) == expected, word
+        top = sorted(expected, key=lambda posting: -posting[1])[:3]
+        assert analyzer.term_documents(word, 3) == top, word
+        frequencies = Counter()
+        for label, count in expected:
+            frequencies[analyzer.metadata[label]['author']] += count
+        assert analyzer.term_frequencies(word) == frequencies, word
+
+
+@pytest.fixture
+def letters():
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    paths = analyzer.get_text_paths('data/Individual Letters')
+    # Load in several batches, querying in between, so the index holds merged segments
+    for start in range(0, len(paths), 3):
+        analyzer.load_texts(paths[start:start + 3], labels=letter_label, workers=1)
+        analyzer.term_documents('war')
+    return analyzer
+
+
+def vocabulary(analyzer):
+    return sorted(set().union(*analyzer.data['wordcount'].values())) + ['notaword']
+
+
+def test_postings_match_scan(letters):
+    assert_index_matches_scan(letters, vocabulary(letters))
+
+
+def test_postings_after_removal_and_compaction(letters):
+    words = vocabulary(letters)
+    for label, _ in letters.term_documents('war')[:2]:
+        letters.remove_document(label)
+    assert_index_matches_scan(letters, words)
+    letters.corpus.compact()
+    assert_index_matches_scan(letters, words)
+
+
+def test_postings_after_save_and_load(letters, tmp_path):
+    letters.remove_document(letters.term_documents('war')[0][0])
+    letters.save(tmp_path)
+    loaded = NLP.NLPTextAnalyzer.load(tmp_path, sentiment=None)
+    assert_index_matches_scan(loaded, vocabulary(loaded))
+    path = letters.get_text_paths('data/Individual Letters')[0]
+    loaded.load_text(path, label='extra')
+    assert_index_matches_scan(loaded, vocabulary(loaded))
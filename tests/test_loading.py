@@ -0,0 +1,103 @@
+"""
+filename: test_loading.py
+description: Documents loaded in a process pool (load_texts) against loading them one by one
+             with load_text.
+"""
+
+import json
+
+import pytest
+
+import NLP_text_analyzer_lib as NLP
+from NLP_instrument import INSTRUMENT
+from NLP_text_analyzer_app import letter_label
+
+FIELDS = ('wordcount', 'numwords', 'polarity', 'subjectivity', 'allwords')
+
+
+def snapshot(analyzer):
+    """ Every document's results, in load order """
+    return {field: list(analyzer.data[field].items()) for field in FIELDS}
+
+
+@pytest.fixture(scope='module')
+def paths():
+    return NLP.NLPTextAnalyzer.get_text_paths('data/Individual Letters')
+
+
+@pytest.fixture(scope='module')
+def one_by_one(paths):
+    analyzer = NLP.NLPTextAnalyzer()
+    for path in paths:
+        analyzer.load_text(path, label=letter_label(path))
+    return snapshot(analyzer)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('parser', [None, 'mmap_parser'])
+def test_load_texts_matches_load_text(paths, one_by_one, workers, parser):
+    analyzer = NLP.NLPTextAnalyzer()
+    errors = analyzer.load_texts(paths, labels=letter_label, workers=workers,
+                                 parser=getattr(analyzer, parser) if parser else None)
+    assert errors == {}
+    assert snapshot(analyzer) == one_by_one
+
+
+def test_load_texts_records_errors(paths, tmp_path):
+    missing = str(tmp_path / 'missing.txt')
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    errors = analyzer.load_texts([paths[0], missing, paths[1]], workers=2)
+    assert list(errors) == [missing]
+    assert list(analyzer.data['numwords']) == [paths[0], paths[1]]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_pipeline_records_default_parser_metrics(paths, workers):
+    metrics = []
+    for load in (lambda analyzer: analyzer.load_texts(paths, workers=workers),
+                 lambda analyzer: analyzer.load_pipeline('data/Individual Letters', workers=workers)):
+        INSTRUMENT.reset()
+        INSTRUMENT.enable()
+        try:
+            load(NLP.NLPTextAnalyzer(sentiment=None))
+            snapshot = INSTRUMENT.snapshot()
+        finally:
+            INSTRUMENT.disable()
+            INSTRUMENT.reset()
+        assert {'punctuation', 'split', 'stopwords'} <= set(snapshot['stages']) and len(snapshot['files']) == len(paths)
+        metrics.append(snapshot['files'])
+    assert metrics[0] == metrics[1]
+
+
+def test_load_all_text_after_load_elsewhere(paths, tmp_path, monkeypatch):
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    analyzer.load_texts(paths, labels=letter_label, workers=1)
+    expected = analyzer.load_all_text(paths)
+    assert analyzer.load_all_text(reuse=True) == expected
+    analyzer.save(tmp_path / 'state')
+
+    # Nothing is parsed, so the relative data and stopword paths aren't needed
+    monkeypatch.chdir(tmp_path)
+    loaded = NLP.NLPTextAnalyzer.load('state', sentiment=None)
+    assert loaded.load_all_text(reuse=True) == expected
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_load_jsonl_keeps_every_record(tmp_path, workers):
+    path = tmp_path / 'letters.jsonl'
+    records = [{'author': 'Hazard Stevens', 'date': '1862-5-1', 'text': 'musket'},
+               {'author': 'Hazard Stevens', 'date': '1862-5-1', 'text': 'cannon'},
+               {'author': 'Riley M. Hoskinson', 'date': '1862-5-1', 'text': 'sabre'},
+               {'text': 'bayonet'}]
+    path.write_text('\n'.join(json.dumps(record) for record in records) + '\n')
+
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    assert analyzer.load_jsonl(str(path), batch_size=2, workers=workers) == 4
+    assert list(analyzer.data['allwords'].items()) == [
+        ('Hazard Stevens 1862-5-1', 'musket'), ('Hazard Stevens 1862-5-1:2', 'cannon'),
+        ('Riley M. Hoskinson 1862-5-1', 'sabre'), ('letters.jsonl:4', 'bayonet')]
+
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    assert analyzer.load_jsonl(str(path), labels=lambda record: record.get('author'), workers=workers) == 3
+    assert list(analyzer.errors) == [f'{path}:2']
+    assert len(analyzer.data['numwords']) == 3
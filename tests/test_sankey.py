@@ -0,0 +1,60 @@
+"""
+filename: test_sankey.py
+description: Sankey links aggregated chunk by chunk against the in-memory DataFrame path.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sankey_lib as sk
+
+COLS = ('Author', 'TextDate', 'Word')
+
+
+@pytest.fixture
+def flows():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    return pd.DataFrame({'Author': rng.choice([f'a{i}' for i in range(12)], n),
+                         'TextDate': rng.choice([f'18{60 + i % 6}-{i % 12 + 1}' for i in range(40)], n),
+                         'Word': rng.choice([f'w{i}' for i in range(200)], n),
+                         'Count': rng.integers(1, 10, n)})
+
+
+def chunks(df, size):
+    return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+
+def assert_same_sankey(got, expected):
+    (link, labels), (expected_link, expected_labels) = got, expected
+    assert labels == expected_labels
+    for key in ('source', 'target', 'value'):
+        assert np.array_equal(link[key], expected_link[key]), key
+
+
+@pytest.mark.parametrize('vals', [None, 'Count'])
+@pytest.mark.parametrize('options', [{}, {'min_value': 2, 'top_n': 20, 'other': 'Other'}])
+def test_chunks_match_dataframe(flows, vals, options):
+    expected = sk.prepare_sankey(flows, *COLS, vals=vals, **options)
+    for size in (13, 300, 1_700, len(flows)):
+        got = sk.prepare_sankey(chunks(flows, size), *COLS, vals=vals, chunksize=500, **options)
+        assert_same_sankey(got, expected)
+
+
+@pytest.mark.parametrize('vals', [None, 'Count'])
+def test_csv_matches_dataframe(flows, tmp_path, vals):
+    path = tmp_path / 'flows.csv'
+    flows.to_csv(path, index=False)
+    expected = sk.prepare_sankey(flows, *COLS, vals=vals, top_n=10, other='Other')
+    assert_same_sankey(sk.prepare_sankey(str(path), *COLS, vals=vals, top_n=10, other='Other', chunksize=700),
+                       expected)
+
+
+def test_missing_values_are_dropped(flows):
+    flows = flows.astype({'TextDate': object})
+    flows.loc[::7, 'TextDate'] = None
+    flows.loc[:99, 'Word'] = None
+    expected = sk.prepare_sankey(flows, *COLS, vals='Count')
+    assert_same_sankey(sk.prepare_sankey(chunks(flows, 100), *COLS, vals='Count'), expected)
+
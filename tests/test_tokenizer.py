@@ -0,0 +1,85 @@
+"""
+filename: test_tokenizer.py
+description: The tokenizer engine and the memory-mapped parsers against the original
+             default parser's word splitting.
+"""
+
+from collections import Counter
+import random
+
+import pytest
+
+import NLP_text_analyzer_lib as NLP
+from NLP_tokenizer import count_file_words, iter_file_words, tokenize_file
+
+STOPWORDS = frozenset(['the', 'and', 'a'])
+
+# Separators, line endings (CR, CRLF and other str.strip() whitespace), multibyte characters,
+# unicode digits and a final sigma, whose lowercasing depends on the following character
+ALPHABET = list('abcΣΑσ ()"?[].&\\,!\t\n\r \x0b\x1c\x85  İé12٣') + ['\r\n', '  ', 'word', 'the', 'and ']
+
+
+def original_words(filepath, stopwords):
+    """ Word list of the original default parser, before it was rewritten as NLP_tokenizer """
+    PUNC = [" ", "(", ")", '"', '?', '[', ']', '', '.', '&', '\\', '\\\\', ',', '//', '//',
+            '\\', '\\\\', '!']
+    text = []
+    all_text = ''
+    with open(filepath, 'r') as f:
+        for line in f.readlines():
+            text.append(line.strip())
+    for i in range(len(text)):
+        for ele in text[i]:
+            if ele in PUNC:
+                text[i] = text[i].replace(ele, ",")
+        all_text += text[i].lower()
+    word_list = all_text.split(',')
+    for i in range(len(word_list)):
+        word_list[i] = ''.join([j for j in word_list[i] if not j.isdigit()])
+    while '' in word_list:
+        word_list.remove('')
+    for w in stopwords:
+        while w in word_list:
+            word_list.remove(w)
+    return word_list
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 60)))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_tokenizers_match_original_parser(tmp_path, seed):
+    path = tmp_path / 'letter.txt'
+    for text in random_texts(50, seed):
+        path.write_text(text, encoding='utf-8', newline='')
+        expected = original_words(path, STOPWORDS)
+        assert tokenize_file(path, STOPWORDS) == expected, repr(text)
+        for chunk_size in (1, 2, 3, 7, 64):
+            words = [w for chunk in iter_file_words(path, STOPWORDS, chunk_size=chunk_size) for w in chunk]
+            assert words == expected, (repr(text), chunk_size)
+        counts, numwords = count_file_words(path, STOPWORDS, chunk_size=5)
+        assert numwords == len(expected) and counts == Counter(expected), repr(text)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+    assert tokenize_file(path) == [] and list(iter_file_words(path)) == []
+
+
+def test_parsers_match_original_on_letters():
+    analyzer = NLP.NLPTextAnalyzer(sentiment=None)
+    stopwords = analyzer.load_stop_words(NLP.STOPWORDS_FILE)
+    paths = analyzer.get_text_paths('data/Individual Letters')
+    assert paths
+    for path in paths:
+        expected = original_words(path, stopwords)
+        default = analyzer._default_parser(path, NLP.STOPWORDS_FILE)
+        mapped = analyzer.mmap_parser(path, NLP.STOPWORDS_FILE)
+        counts = analyzer.mmap_counts_parser(path, NLP.STOPWORDS_FILE)
+        assert default['allwords'] == mapped['allwords'] == ' '.join(expected)
+        assert default['wordcount'] == mapped['wordcount'] == counts['wordcount'] == Counter(expected)
+        assert default['numwords'] == mapped['numwords'] == counts['numwords'] == len(expected)